@@ -1,34 +1,64 @@
 #!/usr/bin/env python3
 import os
+import re
 import json
 import uuid
+import time
 import asyncio
-from datetime import datetime
-from typing import Dict, Optional, Any, List
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Query
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Any, List, Tuple
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import uvicorn
 import concurrent.futures
 import threading
+from collections import OrderedDict
 import yt_dlp
 
 # Import the processing functions from main.py
 from main import (
-    process_youtube_audio, 
     get_video_id, 
     setup_folder_structure, 
     get_output_paths,
+    find_existing_files,
     is_video_processed,
-    setup_logging
+    setup_logging,
+    download_audio,
+    split_audio,
+    get_whisper_model,
+    preload_whisper_model,
+    needs_audio_split,
+    transcribe_audio,
+    transcribe_segments,
+    combine_transcriptions,
+    extract_text_from_json,
+    process_transcription_with_llm,
+    generate_html,
+    PROMPT_TEMPLATE
 )
 
 # Import database
-from database import db
+from database import db, async_db
 
 # ================ Configuration ================
 DEFAULT_OUTPUT_DIR = "downloads"
+PROGRESS_UPDATE_INTERVAL = 0.5  # Seconds after a progress write during which ticks are buffered
+PROGRESS_FLUSH_EVERY = 4  # Progress ticks buffered before a forced write
+FILE_BUFFER_SIZE = 1 << 20  # 1 MiB buffer for transcript/LLM output files
+
+# Thread pool sizes. Both are per server process: with several uvicorn
+# workers, each worker gets its own pools of this size.
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "4"))  # asyncio default executor
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))  # Videos processed concurrently
+
+# Video URLs accepted by the API: youtube.com/watch?v=<id> or youtu.be/<id>
+YOUTUBE_URL_RE = re.compile(
+    r'^https?://(?:(?:www\.)?youtube\.com/watch\?(?:\S*&)?v=|youtu\.be/)[A-Za-z0-9_-]{11}(?=$|[?&#])'
+)
+# The video ID names the task's download folder, so it must be exactly this
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
 
 # ================ Data Models ================
 class VideoRequest(BaseModel):
@@ -50,6 +80,16 @@ class TaskStatus(BaseModel):
     segments_count: Optional[int] = None
     transcription_length: Optional[int] = None
 
+class TaskSummary(BaseModel):
+    task_id: str
+    video_id: str
+    video_title: Optional[str] = None
+    status: str
+    created_at: str
+    updated_at: str
+    processing_time: Optional[float] = None
+    segments_count: Optional[int] = None
+
 class TaskStats(BaseModel):
     total_tasks: int
     status_counts: Dict[str, int]
@@ -57,8 +97,15 @@ class TaskStats(BaseModel):
     recent_tasks: int
 
 # ================ Global State ================
-# Thread pool for CPU-intensive tasks
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+# Bounds how many videos are processed at once; created on startup so it
+# binds to the server's event loop
+job_semaphore: Optional[asyncio.Semaphore] = None
+
+# Folder and output paths per video_id, shared by the worker and the endpoints.
+# Least recently used entries are dropped beyond VIDEO_PATHS_CACHE_SIZE.
+VIDEO_PATHS_CACHE_SIZE = 1024
+video_paths_cache: "OrderedDict[str, Tuple[dict, dict]]" = OrderedDict()
+video_paths_lock = threading.Lock()
 
 # ================ FastAPI App ================
 app = FastAPI(
@@ -92,6 +139,79 @@ def get_video_info(url: str) -> Dict[str, str]:
         print(f"Error getting video info: {e}")
         return {'title': 'Unknown Title', 'duration': 0, 'uploader': 'Unknown', 'view_count': 0}
 
+def store_video_title(task_id: str, url: str) -> None:
+    """Look up the video title and store it on the task as soon as it is known."""
+    db.update_task_metadata(task_id, video_title=get_video_info(url)['title'])
+
+def get_video_paths(video_id: str) -> Tuple[dict, dict]:
+    """Return (folders, output_paths) for a video, creating its folders on first use.
+    
+    Cached entries don't recreate folders removed since; the worker calls
+    ensure_video_folders before writing to them.
+    """
+    with video_paths_lock:
+        paths = video_paths_cache.get(video_id)
+        if paths is not None:
+            video_paths_cache.move_to_end(video_id)
+            return paths
+        folders = setup_folder_structure(DEFAULT_OUTPUT_DIR, video_id)
+        paths = (folders, get_output_paths(folders, video_id))
+        video_paths_cache[video_id] = paths
+        if len(video_paths_cache) > VIDEO_PATHS_CACHE_SIZE:
+            video_paths_cache.popitem(last=False)
+    return paths
+
+def ensure_video_folders(folders: dict) -> None:
+    """Recreate any of a video's folders that were removed since its paths were cached."""
+    for folder_type, folder_path in folders.items():
+        # The segments folder is created by split_audio when needed
+        if folder_type != 'segments':
+            os.makedirs(folder_path, exist_ok=True)
+
+def invalidate_video_paths(video_id: str) -> None:
+    """Drop the cached paths for a video."""
+    with video_paths_lock:
+        video_paths_cache.pop(video_id, None)
+
+def get_result_path(task: Dict) -> str:
+    """Return the HTML path of a completed task.
+    
+    The worker records it in the task progress on completion, so the read
+    path doesn't need to rebuild the folder structure.
+    """
+    html_path = task['progress'].get('html_path')
+    if html_path:
+        return html_path
+    folders, output_paths = get_video_paths(task['video_id'])
+    return output_paths['processed_html']
+
+def conditional_file_response(request: Request, path: str, etag_key: str, **kwargs) -> Response:
+    """Serve a result file with ETag/Last-Modified validators, answering 304 when unchanged."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="HTML file not found")
+    
+    etag = f'"{etag_key}-{int(stat.st_mtime)}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            if int(stat.st_mtime) <= parsedate_to_datetime(request.headers["if-modified-since"]).timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    
+    return FileResponse(path, headers=headers, stat_result=stat, **kwargs)
+
 def calculate_file_size(file_path: str) -> float:
     """Calculate file size in MB."""
     try:
@@ -105,24 +225,26 @@ def calculate_file_size(file_path: str) -> float:
 def process_video_sync(task_id: str, url: str):
     """Synchronous processing function that runs in a thread pool."""
     logger = setup_logging()
-    start_time = datetime.now()
+    start_time = time.monotonic()
     
     try:
         # Get video ID and set up paths
         video_id = get_video_id(url)
-        folders = setup_folder_structure(DEFAULT_OUTPUT_DIR, video_id)
-        output_paths = get_output_paths(folders, video_id)
+        folders, output_paths = get_video_paths(video_id)
+        ensure_video_folders(folders)
+        
+        # Look up the title in the background; it overlaps with the audio download
+        # and is shown as soon as it arrives, even if the download fails
+        threading.Thread(target=store_video_title, args=(task_id, url), daemon=True).start()
         
-        # Get video info and update database
-        video_info = get_video_info(url)
         db.update_task_status(task_id, "processing", {
             "current_step": "Initializing",
             "message": "Starting video processing..."
-        }, video_title=video_info['title'])
+        })
         
         # Check if already processed
         if is_video_processed(output_paths):
-            processing_time = (datetime.now() - start_time).total_seconds()
+            processing_time = time.monotonic() - start_time
             db.update_task_status(task_id, "completed", {
                 "current_step": "Completed",
                 "message": "Video already processed",
@@ -131,6 +253,10 @@ def process_video_sync(task_id: str, url: str):
             db.update_task_metadata(task_id, processing_time=processing_time)
             return
         
+        # Load the model while the audio downloads
+        if not os.path.exists(output_paths['full_transcript_txt']):
+            preload_whisper_model()
+        
         # Step 1: Download audio
         db.update_task_status(task_id, "processing", {
             "current_step": "Downloading Audio",
@@ -138,22 +264,26 @@ def process_video_sync(task_id: str, url: str):
         })
         
         if not os.path.exists(output_paths['audio']):
-            from main import download_audio
             download_audio(url, folders['audio'], logger)
         
-        # Step 2: Split audio
-        db.update_task_status(task_id, "processing", {
-            "current_step": "Splitting Audio",
-            "message": "Splitting audio into segments..."
-        })
-        
-        if not any(os.path.exists(f) for f in output_paths['segments']):
-            from main import split_audio
-            split_audio(output_paths['audio'], folders['segments'], logger)
-        
-        # Count segments
-        segment_files = [f for f in output_paths['segments'] if os.path.exists(f)]
-        db.update_task_metadata(task_id, segments_count=len(segment_files))
+        # Step 2: Split audio (only for backends that transcribe segment files)
+        split_audio_files = needs_audio_split()
+        segment_files = []
+        if split_audio_files:
+            db.update_task_status(task_id, "processing", {
+                "current_step": "Splitting Audio",
+                "message": "Splitting audio into segments..."
+            })
+            
+            segment_files = find_existing_files(folders['segments'], ".wav")
+            if not segment_files:
+                split_audio(output_paths['audio'], folders['segments'], logger)
+                segment_files = find_existing_files(folders['segments'], ".wav")
+            if not segment_files:
+                raise RuntimeError("Splitting the audio produced no segments")
+            
+            # Count segments
+            db.update_task_metadata(task_id, segments_count=len(segment_files))
         
         # Step 3: Transcribe
         db.update_task_status(task_id, "processing", {
@@ -162,37 +292,48 @@ def process_video_sync(task_id: str, url: str):
         })
         
         if not os.path.exists(output_paths['full_transcript_txt']):
-            from main import (
-                whisper, transcribe_segment, save_segment_json,
-                combine_transcriptions, extract_text_from_json
-            )
+            model = get_whisper_model()
             
-            model = whisper.load_model("turbo")
+            pending_progress = []
+            last_progress_write = 0.0
             
-            for i, segment_file in enumerate(segment_files):
-                transcription_path = output_paths['transcriptions'][i]
-                if not os.path.exists(transcription_path):
-                    result = transcribe_segment(model, segment_file, logger)
-                    save_segment_json(result, transcription_path, i + 1, logger)
-                
-                # Update progress for each segment
-                progress = (i + 1) / len(segment_files) * 100
-                db.update_task_status(task_id, "processing", {
-                    "current_step": "Transcribing",
-                    "message": f"Transcribing segment {i + 1}/{len(segment_files)}",
-                    "progress_percent": progress
+            def report_progress(done: int, total: int):
+                # Buffer progress ticks and write them in one transaction: when
+                # enough are pending, the interval has passed, or on the final tick
+                nonlocal last_progress_write
+                pending_progress.append({
+                    "status": "processing",
+                    "progress": {
+                        "current_step": "Transcribing",
+                        "message": f"Transcribing segment {done}/{total}",
+                        "progress_percent": done / total * 100
+                    }
                 })
+                now = time.monotonic()
+                if (done < total and len(pending_progress) < PROGRESS_FLUSH_EVERY
+                        and now - last_progress_write < PROGRESS_UPDATE_INTERVAL):
+                    return
+                last_progress_write = now
+                db.update_task_status_bulk(task_id, pending_progress)
+                pending_progress.clear()
+            
+            if split_audio_files:
+                segment_json_files = transcribe_segments(model, segment_files, output_paths['transcriptions'], logger,
+                                                         on_progress=report_progress)
+            else:
+                segment_json_files = transcribe_audio(model, output_paths['audio'], output_paths['transcriptions'],
+                                                      logger, on_progress=report_progress)
             
             # Combine transcriptions
-            segment_json_files = [f for f in output_paths['transcriptions'] if os.path.exists(f)]
+            if not split_audio_files:
+                db.update_task_metadata(task_id, segments_count=len(segment_json_files))
             combine_transcriptions(segment_json_files, output_paths['full_transcript_json'], logger)
             extract_text_from_json(output_paths['full_transcript_json'], output_paths['full_transcript_txt'], logger)
         
-        # Get transcription length
-        if os.path.exists(output_paths['full_transcript_txt']):
-            with open(output_paths['full_transcript_txt'], 'r', encoding='utf-8') as f:
-                transcription_length = len(f.read())
-            db.update_task_metadata(task_id, transcription_length=transcription_length)
+        # Read the transcript once; it serves both the length metadata and the LLM step
+        with open(output_paths['full_transcript_txt'], 'r', encoding='utf-8', buffering=FILE_BUFFER_SIZE) as f:
+            transcription_text = f.read()
+        db.update_task_metadata(task_id, transcription_length=len(transcription_text))
         
         # Step 4: LLM Processing
         db.update_task_status(task_id, "processing", {
@@ -200,15 +341,13 @@ def process_video_sync(task_id: str, url: str):
             "message": "Processing with local LLM..."
         })
         
+        # Kept in memory for the HTML step; the file on disk is only a cache
+        processed_content = None
         if not os.path.exists(output_paths['processed_content']):
-            from main import process_transcription_with_llm, PROMPT_TEMPLATE
+            # Runs on a worker thread, which has no event loop of its own
+            processed_content = asyncio.run(process_transcription_with_llm(transcription_text, PROMPT_TEMPLATE, logger))
             
-            with open(output_paths['full_transcript_txt'], 'r', encoding='utf-8') as f:
-                transcription_text = f.read()
-            
-            processed_content = process_transcription_with_llm(transcription_text, PROMPT_TEMPLATE, logger)
-            
-            with open(output_paths['processed_content'], 'w', encoding='utf-8') as f:
+            with open(output_paths['processed_content'], 'w', encoding='utf-8', buffering=FILE_BUFFER_SIZE) as f:
                 f.write(processed_content)
         
         # Step 5: Generate HTML
@@ -218,11 +357,13 @@ def process_video_sync(task_id: str, url: str):
         })
         
         if not os.path.exists(output_paths['processed_html']):
-            from main import generate_html
+            if processed_content is None:
+                with open(output_paths['processed_content'], 'r', encoding='utf-8', buffering=FILE_BUFFER_SIZE) as f:
+                    processed_content = f.read()
             generate_html(processed_content, output_paths['processed_html'])
         
         # Calculate final metadata
-        processing_time = (datetime.now() - start_time).total_seconds()
+        processing_time = time.monotonic() - start_time
         file_size = calculate_file_size(output_paths['processed_html'])
         
         # Mark as completed
@@ -235,32 +376,33 @@ def process_video_sync(task_id: str, url: str):
         
     except Exception as e:
         logger.error(f"Error in background task: {e}")
-        processing_time = (datetime.now() - start_time).total_seconds()
+        processing_time = time.monotonic() - start_time
         db.update_task_status(task_id, "failed", error_message=str(e))
         db.update_task_metadata(task_id, processing_time=processing_time)
 
 # ================ Background Task ================
 async def process_video_background(task_id: str, url: str):
-    """Background task to process YouTube video - runs in thread pool."""
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(executor, process_video_sync, task_id, url)
+    """Background task to process YouTube video - runs in the default thread pool."""
+    # Queued jobs wait here instead of piling up in the thread pool
+    async with job_semaphore:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, process_video_sync, task_id, url)
 
 # ================ API Endpoints ================
 @app.post("/api/process", response_model=Dict[str, str])
 async def process_video(request: VideoRequest, background_tasks: BackgroundTasks):
     """Start processing a YouTube video."""
+    # Validate URL before touching the database
+    if not YOUTUBE_URL_RE.match(request.url) or not VIDEO_ID_RE.match(get_video_id(request.url)):
+        raise HTTPException(status_code=400, detail="Invalid YouTube URL")
+    
     try:
-        # Validate URL
-        from main import is_valid_youtube_url
-        if not is_valid_youtube_url(request.url):
-            raise HTTPException(status_code=400, detail="Invalid YouTube URL")
-        
         # Generate task ID
         task_id = str(uuid.uuid4())
         video_id = get_video_id(request.url)
         
         # Create task in database
-        if not db.create_task(task_id, video_id, request.url):
+        if not await async_db.create_task(task_id, video_id, request.url):
             raise HTTPException(status_code=500, detail="Failed to create task")
         
         # Start background task
@@ -273,13 +415,15 @@ async def process_video(request: VideoRequest, background_tasks: BackgroundTasks
             "message": "Video processing started"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/status/{task_id}", response_model=TaskStatus)
 async def get_task_status(task_id: str):
     """Get the status of a processing task."""
-    task = db.get_task(task_id)
+    task = await async_db.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -287,84 +431,86 @@ async def get_task_status(task_id: str):
 
 @app.get("/api/tasks", response_model=List[TaskStatus])
 async def list_tasks(
-    status: Optional[str] = Query(None, description="Filter by status"),
+    status: Optional[str] = Query(None, description="Filter by status, or 'active' for queued and processing tasks"),
     limit: int = Query(50, ge=1, le=100, description="Number of tasks to return"),
+    before: Optional[str] = Query(None, description="Only return tasks created before this timestamp (created_at of the last task on the previous page)"),
     offset: int = Query(0, ge=0, description="Number of tasks to skip")
 ):
     """List tasks with optional filtering."""
-    tasks = db.get_tasks(status=status, limit=limit, offset=offset)
-    return [TaskStatus(**task) for task in tasks]
+    tasks = await async_db.get_tasks(status=status, limit=limit, before=before, offset=offset)
+    # Rows are already in TaskStatus shape; serialize them directly
+    body = b'[' + b','.join(task.to_json_bytes() for task in tasks) + b']'
+    return Response(content=body, media_type="application/json")
+
+@app.get("/api/tasks/summary", response_model=List[TaskSummary])
+async def list_task_summaries(
+    status: Optional[str] = Query(None, description="Filter by status, or 'active' for queued and processing tasks"),
+    limit: int = Query(50, ge=1, le=100, description="Number of tasks to return"),
+    before: Optional[str] = Query(None, description="Only return tasks created before this timestamp (created_at of the last task on the previous page)"),
+    offset: int = Query(0, ge=0, description="Number of tasks to skip")
+):
+    """List tasks without progress details, for lightweight listings."""
+    tasks = await async_db.get_tasks_summary(status=status, limit=limit, before=before, offset=offset)
+    return [TaskSummary(**task) for task in tasks]
 
 @app.get("/api/stats", response_model=TaskStats)
 async def get_stats():
     """Get task statistics."""
-    stats = db.get_task_stats()
+    stats = await async_db.get_task_stats()
     return TaskStats(**stats)
 
 @app.get("/api/result/{task_id}")
-async def get_result(task_id: str):
+async def get_result(task_id: str, request: Request):
     """Get the HTML result for a completed task (download)."""
-    task = db.get_task(task_id)
+    task = await async_db.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     if task['status'] != "completed":
         raise HTTPException(status_code=400, detail="Task not completed")
     
-    # Get the HTML file path
-    folders = setup_folder_structure(DEFAULT_OUTPUT_DIR, task['video_id'])
-    output_paths = get_output_paths(folders, task['video_id'])
-    
-    if not os.path.exists(output_paths['processed_html']):
-        raise HTTPException(status_code=404, detail="HTML file not found")
-    
-    return FileResponse(
-        output_paths['processed_html'],
+    return conditional_file_response(
+        request,
+        get_result_path(task),
+        task_id,
         media_type='text/html',
         filename=f"{task['video_id']}_summary.html"
     )
 
 @app.get("/api/preview/{task_id}")
-async def preview_result(task_id: str):
+async def preview_result(task_id: str, request: Request):
     """Preview the HTML result for a completed task (opens in browser)."""
-    task = db.get_task(task_id)
+    task = await async_db.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     if task['status'] != "completed":
         raise HTTPException(status_code=400, detail="Task not completed")
     
-    # Get the HTML file path
-    folders = setup_folder_structure(DEFAULT_OUTPUT_DIR, task['video_id'])
-    output_paths = get_output_paths(folders, task['video_id'])
-    
-    if not os.path.exists(output_paths['processed_html']):
-        raise HTTPException(status_code=404, detail="HTML file not found")
-    
-    # Read the HTML content and return it directly
-    with open(output_paths['processed_html'], 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    return HTMLResponse(content=html_content)
+    # Stream the file; without a filename it is served inline
+    return conditional_file_response(request, get_result_path(task), task_id, media_type='text/html')
 
 @app.get("/api/events/{task_id}")
 async def get_task_events(task_id: str, limit: int = Query(20, ge=1, le=100)):
     """Get events for a specific task."""
-    events = db.get_task_events(task_id, limit=limit)
+    events = await async_db.get_task_events(task_id, limit=limit)
     return events
 
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: str):
     """Delete a task."""
-    if not db.delete_task(task_id):
+    task = await async_db.get_task(task_id)
+    if not task or not await async_db.delete_task(task_id):
         raise HTTPException(status_code=404, detail="Task not found")
     
+    invalidate_video_paths(task['video_id'])
+    
     return {"message": "Task deleted successfully"}
 
 @app.post("/api/cleanup")
 async def cleanup_old_tasks(days: int = Query(30, ge=1, le=365)):
     """Clean up old completed/failed tasks."""
-    deleted_count = db.cleanup_old_tasks(days)
+    deleted_count = await async_db.cleanup_old_tasks(days)
     return {"message": f"Cleaned up {deleted_count} old tasks"}
 
 # ================ Frontend Route ================
@@ -377,6 +523,13 @@ async def get_frontend():
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup."""
+    global job_semaphore
+    # Size the default executor explicitly; video jobs run in it too, at
+    # most MAX_CONCURRENT_JOBS at a time, leaving the rest for other calls
+    asyncio.get_running_loop().set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE)
+    )
+    job_semaphore = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
     print("🚀 YouTube to HTML Summary API starting...")
     print("📊 Database initialized")
 
@@ -384,7 +537,6 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown."""
-    executor.shutdown(wait=True)
     print("👋 Server shutdown complete")
 
 # ================ Main ================
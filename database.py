@@ -6,31 +6,360 @@ Handles SQLite operations for task storage and management.
 
 import sqlite3
 import json
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import queue
+import atexit
+import threading
+import time
+import itertools
+import logging
+import asyncio
+import functools
+import concurrent.futures
+from typing import Dict, List, Optional, Any, Tuple
+from collections.abc import Mapping
 from contextlib import contextmanager
 import os
 
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:  # declared dependency; without it progress is stored as JSON text
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+if orjson is not None:
+    # JSON progress is stored as TEXT, so hand SQLite a str rather than bytes
+    _dumps = lambda o: orjson.dumps(o).decode()
+    _loads = orjson.loads
+else:
+    _dumps = lambda o: json.dumps(o, ensure_ascii=False, separators=(',', ':'))
+    _loads = json.loads
+
+def encode_progress(progress: Dict):
+    """Serialize a progress dict compactly for storage.
+    
+    Uses a msgpack BLOB when msgpack is installed, JSON TEXT otherwise.
+    """
+    if msgpack is not None:
+        return msgpack.packb(progress, use_bin_type=True)
+    return _dumps(progress)
+
+def decode_progress(value) -> Dict:
+    """Deserialize a stored progress value, either msgpack BLOB or JSON TEXT.
+    
+    BLOBs written by an install with msgpack cannot be read without it; their
+    progress is reported as empty rather than failing the whole request.
+    """
+    if not value:
+        return {}
+    if isinstance(value, bytes):
+        if msgpack is None:
+            logger.warning("Task progress is stored as msgpack but msgpack is not installed; "
+                           "install it to read progress of existing tasks")
+            return {}
+        return msgpack.unpackb(value, raw=False)
+    return _loads(value)
+
+# (second, formatted prefix) of the last timestamp, replaced as a whole
+_timestamp_prefix = (None, "")
+
+def now_iso() -> str:
+    """Current local time in ISO format, as datetime.now().isoformat() gives.
+    
+    Status updates arrive many times per second, so the date and time part
+    is formatted once per second and only the microseconds change.
+    """
+    global _timestamp_prefix
+    now = time.time()
+    second = int(now)
+    cached_second, prefix = _timestamp_prefix
+    if second != cached_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+        _timestamp_prefix = (second, prefix)
+    return f"{prefix}.{int((now - second) * 1_000_000):06d}"
+
+# SQL used on the hot paths. Keeping the text fixed lets every connection
+# reuse its compiled statement from sqlite3's per-connection cache.
+INSERT_TASK_SQL = """
+    INSERT INTO tasks (
+        task_id, video_id, video_url, video_title, status,
+        progress, created_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_EVENT_SQL = """
+    INSERT INTO task_events (task_id, event_type, message, timestamp)
+    VALUES (?, ?, ?, ?)
+"""
+
+# NULL parameters leave the existing value in place
+UPDATE_TASK_STATUS_SQL = """
+    UPDATE tasks SET
+        status = ?,
+        updated_at = ?,
+        progress = COALESCE(?, progress),
+        error_message = COALESCE(?, error_message),
+        video_title = COALESCE(?, video_title),
+        completed_at = CASE WHEN ? = 'completed' THEN ? ELSE completed_at END
+    WHERE task_id = ?
+"""
+
+TASK_COLUMNS = """
+    task_id, video_id, video_url, video_title, status, progress,
+    error_message, created_at, updated_at, completed_at,
+    processing_time, file_size, segments_count, transcription_length
+"""
+
+# Just what a task list needs; leaves out the progress blob and error text
+TASK_SUMMARY_COLUMNS = """
+    task_id, video_id, video_title, status, created_at, updated_at,
+    processing_time, segments_count
+"""
+
+SELECT_TASK_SQL = f"SELECT {TASK_COLUMNS} FROM tasks WHERE task_id = ?"
+
+# SQLite 3.35+ can hand back the written row in the same statement, saving
+# a follow-up SELECT after create_task / update_task_status
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+INSERT_TASK_RETURNING_SQL = f"{INSERT_TASK_SQL} RETURNING {TASK_COLUMNS}"
+UPDATE_TASK_STATUS_RETURNING_SQL = f"{UPDATE_TASK_STATUS_SQL} RETURNING {TASK_COLUMNS}"
+
+# Tasks still in flight. Written out literally wherever it's used so SQLite
+# can match queries to the idx_tasks_active partial index.
+ACTIVE_STATUSES_SQL = "status IN ('queued', 'processing')"
+
+# Status filter value that selects every active task
+ACTIVE_FILTER = "active"
+
+# Row filters for task listings: everything, one status, or the active set,
+# as (table, conditions). Without ANALYZE statistics the planner prefers the
+# composite status index plus a sort, so the active set names its index.
+_TASK_LIST_FILTERS = {
+    'all': ("tasks", []),
+    'status': ("tasks", ["status = ?"]),
+    'active': ("tasks INDEXED BY idx_tasks_active", [ACTIVE_STATUSES_SQL]),
+}
+
+def _task_list_sql(columns: str, table: str, conditions: List[str], keyset: bool) -> str:
+    """Build a newest-first task listing query.
+    
+    The keyset variant seeks past the previous page instead of skipping rows.
+    """
+    if keyset:
+        conditions = conditions + ["created_at < ?"]
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    paging = "LIMIT ?" if keyset else "LIMIT ? OFFSET ?"
+    return f"SELECT {columns} FROM {table}{where} ORDER BY created_at DESC {paging}"
+
+# Task listings keyed by (filter, keyset paginated)
+SELECT_TASKS_SQL = {
+    (name, keyset): _task_list_sql(TASK_COLUMNS, table, conditions, keyset)
+    for name, (table, conditions) in _TASK_LIST_FILTERS.items() for keyset in (False, True)
+}
+SELECT_TASK_SUMMARIES_SQL = {
+    (name, keyset): _task_list_sql(TASK_SUMMARY_COLUMNS, table, conditions, keyset)
+    for name, (table, conditions) in _TASK_LIST_FILTERS.items() for keyset in (False, True)
+}
+
+DELETE_TASK_SQL = "DELETE FROM tasks WHERE task_id = ?"
+
+# Columns update_task_metadata may set, in the order they appear in its SQL
+METADATA_FIELDS = (
+    'processing_time', 'file_size', 'segments_count',
+    'transcription_length', 'video_title'
+)
+
+# One prebuilt UPDATE per non-empty subset of METADATA_FIELDS (31), keyed by
+# the frozenset of field names
+METADATA_UPDATE_SQL = {
+    frozenset(fields): "UPDATE tasks SET {} WHERE task_id = ?".format(
+        ", ".join(f"{field} = ?" for field in fields))
+    for size in range(1, len(METADATA_FIELDS) + 1)
+    for fields in itertools.combinations(METADATA_FIELDS, size)
+}
+
+# Per-status counts, summed processing time of completed tasks and
+# last-24h activity in a single scan
+TASK_STATS_SQL = """
+    SELECT status,
+           COUNT(*),
+           SUM(CASE WHEN status = 'completed' THEN processing_time END),
+           COUNT(CASE WHEN status = 'completed' THEN processing_time END),
+           SUM(CASE WHEN created_at >= datetime('now', '-1 day') THEN 1 ELSE 0 END)
+    FROM tasks
+    GROUP BY status
+"""
+
+# Events go with their task via the tasks_delete_events trigger
+DELETE_OLD_TASKS_SQL = """
+    DELETE FROM tasks
+    WHERE created_at < datetime('now', ?)
+    AND status IN ('completed', 'failed')
+"""
+
+SELECT_TASK_EVENTS_SQL = """
+    SELECT * FROM task_events
+    WHERE task_id = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+
+# Buffered task events are written in one executemany once this many pile up,
+# or when a task finishes. The buffer is per process: with several server
+# workers, a worker's /api/events only sees events the others have flushed.
+EVENT_FLUSH_SIZE = 32
+TERMINAL_STATUSES = frozenset(("completed", "failed"))
+
+# Number of compiled statements each connection keeps around
+STATEMENT_CACHE_SIZE = 256
+
+# Bump whenever init_database changes, so existing databases rerun it
+SCHEMA_VERSION = 2
+
+# Applied once to every pooled connection
+CONNECTION_PRAGMAS = (
+    # Write-ahead logging: status updates append to the WAL instead of
+    # rewriting pages, and readers don't block on the writer
+    "PRAGMA journal_mode=WAL",
+    # With WAL, NORMAL only syncs at checkpoints instead of every commit
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",  # 64 MB page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB memory-mapped I/O
+)
+
+def task_from_row(row: sqlite3.Row) -> Dict:
+    """Convert a tasks row to a dict with its progress decoded."""
+    task = dict(row)
+    task['progress'] = decode_progress(task['progress'])
+    return task
+
+_UNDECODED = object()
+
+class TaskView(Mapping):
+    """Read-only view of a task row that decodes progress only when accessed.
+    
+    Behaves like the dict get_task returns, without copying the row.
+    """
+    __slots__ = ('_row', '_progress')
+    
+    def __init__(self, row: sqlite3.Row):
+        self._row = row
+        self._progress = _UNDECODED
+    
+    @property
+    def progress(self) -> Dict:
+        if self._progress is _UNDECODED:
+            self._progress = decode_progress(self._row['progress'])
+        return self._progress
+    
+    def __getitem__(self, key: str):
+        if key == 'progress':
+            return self.progress
+        try:
+            return self._row[key]
+        except IndexError:
+            raise KeyError(key) from None
+    
+    def __iter__(self):
+        return iter(self._row.keys())
+    
+    def __len__(self) -> int:
+        return len(self._row)
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize the task straight to JSON, as the API returns it."""
+        task = dict(zip(self._row.keys(), self._row))
+        task['progress'] = self.progress
+        if orjson is not None:
+            return orjson.dumps(task)
+        return _dumps(task).encode()
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "youtube_summary.db"):
+    def __init__(self, db_path: str = "youtube_summary.db", pool_size: int = 8):
         self.db_path = db_path
+        self.pool_size = pool_size
+        # Connections are opened lazily, up to pool_size, and reused afterwards
+        self._pool = queue.Queue(maxsize=pool_size)
+        self._pool_count = 0
+        self._pool_lock = threading.Lock()
+        # Task events waiting to be written, as INSERT_EVENT_SQL parameter tuples
+        self._event_buffer: List[Tuple] = []
+        self._event_lock = threading.Lock()
         self.init_database()
+        atexit.register(self.flush_events)
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open a new connection for the pool."""
+        # Pooled connections are handed to whichever thread asks next
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _acquire_connection(self) -> sqlite3.Connection:
+        """Take a connection from the pool, opening one if the pool isn't full yet."""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._pool_count < self.pool_size:
+                self._pool_count += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._create_connection()
+            except Exception:
+                with self._pool_lock:
+                    self._pool_count -= 1
+                raise
+        return self._pool.get()
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        """Context manager for pooled database connections."""
+        conn = self._acquire_connection()
         try:
             yield conn
         finally:
-            conn.close()
+            # Don't hand a half-finished transaction to the next caller
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+    
+    @contextmanager
+    def _safe(self, message: str):
+        """Log and swallow SQLite errors raised inside the block.
+        
+        The calling method then falls through to its failure return value.
+        """
+        try:
+            yield
+        except sqlite3.Error:
+            logger.exception(message)
     
     def init_database(self):
-        """Initialize the database with required tables."""
+        """Initialize the database with required tables.
+        
+        Skipped when the database's user_version shows it is already current.
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] == SCHEMA_VERSION:
+                return
+            
             # Create tasks table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS tasks (
@@ -39,7 +368,7 @@ class DatabaseManager:
                     video_url TEXT NOT NULL,
                     video_title TEXT,
                     status TEXT NOT NULL,
-                    progress TEXT,  -- JSON string
+                    progress BLOB,  -- msgpack, or JSON text without msgpack
                     error_message TEXT,
                     created_at TEXT NOT NULL,
                     updated_at TEXT NOT NULL,
@@ -63,285 +392,355 @@ class DatabaseManager:
                 )
             """)
             
+            # Convert progress written as JSON text by older versions
+            if msgpack is not None:
+                cursor.execute("SELECT task_id, progress FROM tasks WHERE typeof(progress) = 'text'")
+                legacy_rows = cursor.fetchall()
+                if legacy_rows:
+                    cursor.executemany(
+                        "UPDATE tasks SET progress = ? WHERE task_id = ?",
+                        [(encode_progress(decode_progress(row['progress'])), row['task_id'])
+                         for row in legacy_rows]
+                    )
+            
             # Create indexes for better performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)")
+            # (status, created_at) serves status-filtered listings in order and
+            # the stats GROUP BY, so the single-column status index is redundant
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks(status, created_at DESC)")
+            cursor.execute("DROP INDEX IF EXISTS idx_tasks_status")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_events_task_id ON task_events(task_id)")
+            # Partial index over in-flight tasks only; stays small however
+            # many finished tasks accumulate
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_tasks_active ON tasks(created_at DESC)
+                WHERE {ACTIVE_STATUSES_SQL}
+            """)
+            
+            # Drop a task's events together with the task. A trigger rather than
+            # ON DELETE CASCADE so existing databases pick it up without a rebuild.
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS tasks_delete_events
+                AFTER DELETE ON tasks
+                BEGIN
+                    DELETE FROM task_events WHERE task_id = OLD.task_id;
+                END
+            """)
+            
+            # PRAGMA doesn't take bound parameters
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             
             conn.commit()
     
-    def create_task(self, task_id: str, video_id: str, video_url: str, video_title: str = None) -> bool:
-        """Create a new task in the database."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                now = datetime.now().isoformat()
-                
-                cursor.execute("""
-                    INSERT INTO tasks (
-                        task_id, video_id, video_url, video_title, status, 
-                        progress, created_at, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    task_id, video_id, video_url, video_title, "queued",
-                    json.dumps({}), now, now
-                ))
-                
-                # Add initial event
-                cursor.execute("""
-                    INSERT INTO task_events (task_id, event_type, message, timestamp)
-                    VALUES (?, ?, ?, ?)
-                """, (task_id, "created", "Task created", now))
-                
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error creating task: {e}")
-            return False
+    def _queue_events(self, events: List[Tuple]) -> bool:
+        """Buffer event rows, returning True once the buffer is due for a flush."""
+        with self._event_lock:
+            self._event_buffer.extend(events)
+            return len(self._event_buffer) >= EVENT_FLUSH_SIZE
+    
+    def _flush_events(self, cursor: sqlite3.Cursor) -> None:
+        """Write all buffered events using an open cursor."""
+        with self._event_lock:
+            events, self._event_buffer = self._event_buffer, []
+        if events:
+            cursor.executemany(INSERT_EVENT_SQL, events)
+    
+    def flush_events(self) -> bool:
+        """Write any buffered task events to the database."""
+        if not self._event_buffer:
+            return True
+        with self._safe("Error flushing task events"), self.get_connection() as conn:
+            self._flush_events(conn.cursor())
+            conn.commit()
+            return True
+        return False
+    
+    def create_task(self, task_id: str, video_id: str, video_url: str,
+                    video_title: str = None) -> Optional[Dict]:
+        """Create a new task in the database, returning it or None on failure."""
+        with self._safe("Error creating task"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            now = now_iso()
+            
+            params = (
+                task_id, video_id, video_url, video_title, "queued",
+                encode_progress({}), now, now
+            )
+            if SUPPORTS_RETURNING:
+                cursor.execute(INSERT_TASK_RETURNING_SQL, params)
+            else:
+                cursor.execute(INSERT_TASK_SQL, params)
+                cursor.execute(SELECT_TASK_SQL, (task_id,))
+            row = cursor.fetchone()
+            
+            # Add initial event
+            if self._queue_events([(task_id, "created", "Task created", now)]):
+                self._flush_events(cursor)
+            
+            conn.commit()
+            return task_from_row(row)
+        return None
+    
+    def _apply_status_updates(self, cursor: sqlite3.Cursor, now: str, updates: List[Tuple],
+                              returning: bool = False) -> Optional[sqlite3.Row]:
+        """Write status changes and their events using an open cursor.
+        
+        Each update is a (task_id, status, progress, error_message, video_title)
+        tuple; trailing fields may be left off. With returning, a single update
+        is written with RETURNING and the updated row is returned.
+        """
+        rows = []
+        events = []
+        flush_now = False
+        for update in updates:
+            task_id, status, progress, error_message, video_title = \
+                tuple(update) + (None,) * (5 - len(update))
+            rows.append((
+                status, now,
+                encode_progress(progress) if progress is not None else None,
+                error_message, video_title,
+                status, now,
+                task_id
+            ))
+            
+            event_message = f"Status changed to {status}"
+            if error_message:
+                event_message += f": {error_message}"
+                flush_now = True
+            flush_now = flush_now or status in TERMINAL_STATUSES
+            events.append((task_id, "status_change", event_message, now))
+        
+        row = None
+        if returning and SUPPORTS_RETURNING and len(rows) == 1:
+            cursor.execute(UPDATE_TASK_STATUS_RETURNING_SQL, rows[0])
+            row = cursor.fetchone()
+        else:
+            cursor.executemany(UPDATE_TASK_STATUS_SQL, rows)
+        
+        # Routine events are buffered and written in batches; errors and
+        # finished tasks are written straight away together with anything pending
+        if self._queue_events(events) or flush_now:
+            self._flush_events(cursor)
+        
+        return row
     
     def update_task_status(self, task_id: str, status: str, progress: Dict = None, 
-                          error_message: str = None, video_title: str = None) -> bool:
-        """Update task status and progress."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                now = datetime.now().isoformat()
-                
-                # Update task
-                update_fields = ["status = ?", "updated_at = ?"]
-                params = [status, now]
-                
-                if progress is not None:
-                    update_fields.append("progress = ?")
-                    params.append(json.dumps(progress))
-                
-                if error_message is not None:
-                    update_fields.append("error_message = ?")
-                    params.append(error_message)
-                
-                if video_title is not None:
-                    update_fields.append("video_title = ?")
-                    params.append(video_title)
-                
-                if status == "completed":
-                    update_fields.append("completed_at = ?")
-                    params.append(now)
-                
-                params.append(task_id)
-                
-                cursor.execute(f"""
-                    UPDATE tasks SET {', '.join(update_fields)}
-                    WHERE task_id = ?
-                """, params)
-                
-                # Add event
-                event_message = f"Status changed to {status}"
-                if error_message:
-                    event_message += f": {error_message}"
-                
-                cursor.execute("""
-                    INSERT INTO task_events (task_id, event_type, message, timestamp)
-                    VALUES (?, ?, ?, ?)
-                """, (task_id, "status_change", event_message, now))
-                
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error updating task status: {e}")
-            return False
+                          error_message: str = None, video_title: str = None) -> Optional[Dict]:
+        """Update task status and progress, returning the updated task or None."""
+        with self._safe("Error updating task status"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            now = now_iso()
+            
+            row = self._apply_status_updates(cursor, now, [
+                (task_id, status, progress, error_message, video_title)
+            ], returning=True)
+            if not SUPPORTS_RETURNING:
+                cursor.execute(SELECT_TASK_SQL, (task_id,))
+                row = cursor.fetchone()
+            
+            conn.commit()
+            return task_from_row(row) if row else None
+        return None
+    
+    def update_task_status_many(self, updates: List[Tuple]) -> bool:
+        """Apply several status updates, possibly for different tasks, in one transaction.
+        
+        Each update is a (task_id, status, progress, error_message, video_title)
+        tuple; trailing fields may be left off. Callers accumulate progress
+        ticks and flush them here rather than committing each one.
+        """
+        if not updates:
+            return True
+        with self._safe("Error updating task status"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            now = now_iso()
+            
+            cursor.execute("BEGIN IMMEDIATE")
+            self._apply_status_updates(cursor, now, updates)
+            
+            conn.commit()
+            return True
+        return False
+    
+    def update_task_status_bulk(self, task_id: str, updates: List[Dict]) -> bool:
+        """Apply several status updates to a task in a single transaction.
+        
+        Each update is a dict of update_task_status keyword arguments
+        (status, progress, error_message, video_title).
+        """
+        return self.update_task_status_many([
+            (task_id, update['status'], update.get('progress'),
+             update.get('error_message'), update.get('video_title'))
+            for update in updates
+        ])
     
     def get_task(self, task_id: str) -> Optional[Dict]:
         """Get a single task by ID."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,))
-                row = cursor.fetchone()
-                
-                if row:
-                    task = dict(row)
-                    task['progress'] = json.loads(task['progress']) if task['progress'] else {}
-                    return task
-                return None
-        except Exception as e:
-            print(f"Error getting task: {e}")
-            return None
-    
-    def get_tasks(self, status: str = None, limit: int = 50, offset: int = 0) -> List[Dict]:
-        """Get tasks with optional filtering."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                query = "SELECT * FROM tasks"
-                params = []
-                
-                if status:
-                    query += " WHERE status = ?"
-                    params.append(status)
-                
-                query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-                params.extend([limit, offset])
-                
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                
-                tasks = []
-                for row in rows:
-                    task = dict(row)
-                    task['progress'] = json.loads(task['progress']) if task['progress'] else {}
-                    tasks.append(task)
-                
-                return tasks
-        except Exception as e:
-            print(f"Error getting tasks: {e}")
-            return []
+        with self._safe("Error getting task"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SELECT_TASK_SQL, (task_id,))
+            row = cursor.fetchone()
+            return task_from_row(row) if row else None
+        return None
+    
+    def _select_tasks(self, cursor: sqlite3.Cursor, queries: Dict, status: Optional[str],
+                      limit: int, before: Optional[str], offset: int) -> List[sqlite3.Row]:
+        """Run the task listing query matching the given filters."""
+        if status == ACTIVE_FILTER:
+            kind, params = 'active', []
+        elif status:
+            kind, params = 'status', [status]
+        else:
+            kind, params = 'all', []
+        if before is not None:
+            params += [before, limit]
+        else:
+            params += [limit, offset]
+        cursor.execute(queries[(kind, before is not None)], params)
+        return cursor.fetchall()
+    
+    def get_tasks(self, status: str = None, limit: int = 50, before: str = None,
+                  offset: int = 0) -> List[TaskView]:
+        """Get tasks with optional filtering, newest first.
+        
+        status may also be ACTIVE_FILTER for all queued and processing tasks.
+        For paging, pass the created_at of the last task on the previous page
+        as before; its cost doesn't grow with page depth the way offset does.
+        """
+        with self._safe("Error getting tasks"), self.get_connection() as conn:
+            rows = self._select_tasks(conn.cursor(), SELECT_TASKS_SQL,
+                                      status, limit, before, offset)
+            return [TaskView(row) for row in rows]
+        return []
+    
+    def get_tasks_summary(self, status: str = None, limit: int = 50, before: str = None,
+                          offset: int = 0) -> List[Dict]:
+        """Like get_tasks, but only the summary columns and no progress decoding."""
+        with self._safe("Error getting task summaries"), self.get_connection() as conn:
+            rows = self._select_tasks(conn.cursor(), SELECT_TASK_SUMMARIES_SQL,
+                                      status, limit, before, offset)
+            return [dict(row) for row in rows]
+        return []
     
     def get_task_stats(self) -> Dict[str, Any]:
         """Get statistics about tasks."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Count by status
-                cursor.execute("""
-                    SELECT status, COUNT(*) as count 
-                    FROM tasks 
-                    GROUP BY status
-                """)
-                status_counts = dict(cursor.fetchall())
-                
-                # Total tasks
-                cursor.execute("SELECT COUNT(*) FROM tasks")
-                total_tasks = cursor.fetchone()[0]
-                
-                # Average processing time for completed tasks
-                cursor.execute("""
-                    SELECT AVG(processing_time) 
-                    FROM tasks 
-                    WHERE status = 'completed' AND processing_time IS NOT NULL
-                """)
-                avg_processing_time = cursor.fetchone()[0] or 0
-                
-                # Recent activity (last 24 hours)
-                cursor.execute("""
-                    SELECT COUNT(*) 
-                    FROM tasks 
-                    WHERE created_at >= datetime('now', '-1 day')
-                """)
-                recent_tasks = cursor.fetchone()[0]
-                
-                return {
-                    "total_tasks": total_tasks,
-                    "status_counts": status_counts,
-                    "avg_processing_time": round(avg_processing_time, 2),
-                    "recent_tasks": recent_tasks
-                }
-        except Exception as e:
-            print(f"Error getting task stats: {e}")
-            return {}
+        with self._safe("Error getting task stats"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(TASK_STATS_SQL)
+            
+            status_counts = {}
+            time_total = 0.0
+            timed_count = 0
+            recent_tasks = 0
+            for status, count, status_time, status_timed, recent in cursor.fetchall():
+                status_counts[status] = count
+                time_total += status_time or 0
+                timed_count += status_timed
+                recent_tasks += recent
+            
+            total_tasks = sum(status_counts.values())
+            avg_processing_time = time_total / timed_count if timed_count else 0
+            
+            return {
+                "total_tasks": total_tasks,
+                "status_counts": status_counts,
+                "avg_processing_time": round(avg_processing_time, 2),
+                "recent_tasks": recent_tasks
+            }
+        return {}
     
     def delete_task(self, task_id: str) -> bool:
         """Delete a task and its events."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Delete events first (foreign key constraint)
-                cursor.execute("DELETE FROM task_events WHERE task_id = ?", (task_id,))
-                
-                # Delete task
-                cursor.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
-                
-                conn.commit()
-                return cursor.rowcount > 0
-        except Exception as e:
-            print(f"Error deleting task: {e}")
-            return False
+        with self._safe("Error deleting task"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Events are removed by the tasks_delete_events trigger,
+            # so write out buffered ones first
+            self._flush_events(cursor)
+            cursor.execute(DELETE_TASK_SQL, (task_id,))
+            
+            conn.commit()
+            return cursor.rowcount > 0
+        return False
     
     def get_task_events(self, task_id: str, limit: int = 20) -> List[Dict]:
         """Get events for a specific task."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT * FROM task_events 
-                    WHERE task_id = ? 
-                    ORDER BY timestamp DESC 
-                    LIMIT ?
-                """, (task_id, limit))
-                
-                rows = cursor.fetchall()
-                return [dict(row) for row in rows]
-        except Exception as e:
-            print(f"Error getting task events: {e}")
-            return []
+        with self._safe("Error getting task events"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Make buffered events visible before reading
+            if self._event_buffer:
+                self._flush_events(cursor)
+                conn.commit()
+            
+            cursor.execute(SELECT_TASK_EVENTS_SQL, (task_id, limit))
+            
+            rows = cursor.fetchall()
+            return [dict(row) for row in rows]
+        return []
     
     def update_task_metadata(self, task_id: str, **kwargs) -> bool:
         """Update task metadata like file size, processing time, etc."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Build dynamic update query
-                valid_fields = {
-                    'processing_time', 'file_size', 'segments_count', 
-                    'transcription_length', 'video_title'
-                }
-                
-                update_fields = []
-                params = []
-                
-                for key, value in kwargs.items():
-                    if key in valid_fields:
-                        update_fields.append(f"{key} = ?")
-                        params.append(value)
-                
-                if not update_fields:
-                    return False
-                
-                params.append(task_id)
-                
-                cursor.execute(f"""
-                    UPDATE tasks SET {', '.join(update_fields)}
-                    WHERE task_id = ?
-                """, params)
-                
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error updating task metadata: {e}")
-            return False
+        with self._safe("Error updating task metadata"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Unknown fields are ignored
+            fields = [field for field in METADATA_FIELDS if field in kwargs]
+            if not fields:
+                return False
+            
+            params = [kwargs[field] for field in fields]
+            params.append(task_id)
+            
+            cursor.execute(METADATA_UPDATE_SQL[frozenset(fields)], params)
+            
+            conn.commit()
+            return True
+        return False
     
     def cleanup_old_tasks(self, days: int = 30) -> int:
         """Clean up old completed/failed tasks."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Delete old events first
-                cursor.execute("""
-                    DELETE FROM task_events 
-                    WHERE task_id IN (
-                        SELECT task_id FROM tasks 
-                        WHERE created_at < datetime('now', '-{} days')
-                        AND status IN ('completed', 'failed')
-                    )
-                """.format(days))
-                
-                # Delete old tasks
-                cursor.execute("""
-                    DELETE FROM tasks 
-                    WHERE created_at < datetime('now', '-{} days')
-                    AND status IN ('completed', 'failed')
-                """.format(days))
-                
-                deleted_count = cursor.rowcount
-                conn.commit()
-                return deleted_count
-        except Exception as e:
-            print(f"Error cleaning up old tasks: {e}")
-            return 0
+        with self._safe("Error cleaning up old tasks"), self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Old events are removed by the tasks_delete_events trigger
+            self._flush_events(cursor)
+            cursor.execute(DELETE_OLD_TASKS_SQL, (f'-{int(days)} days',))
+            
+            deleted_count = cursor.rowcount
+            conn.commit()
+            return deleted_count
+        return 0
+
+class AsyncDatabaseManager:
+    """Awaitable front end to a DatabaseManager for async request handlers.
+    
+    Every public DatabaseManager method is available as a coroutine that runs
+    the synchronous call on a dedicated thread pool, one thread per pooled
+    connection, so handlers don't block the event loop and database calls
+    don't queue behind long-running jobs on the loop's default executor.
+    """
+    
+    def __init__(self, manager: DatabaseManager):
+        self._manager = manager
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=manager.pool_size, thread_name_prefix="db")
+    
+    def __getattr__(self, name: str):
+        attr = getattr(self._manager, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(attr, *args, **kwargs))
+        
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, call)
+        return call
 
-# Global database instance
-db = DatabaseManager() 
\ No newline at end of file
+# Global database instances
+db = DatabaseManager()
+async_db = AsyncDatabaseManager(db) 
\ No newline at end of file
@@ -4,17 +4,38 @@ import sys
 import json
 import logging
 import yt_dlp
-import whisper
+import ctranslate2
 import re
+import math
+import bisect
+import functools
+import asyncio
+import threading
+import wave
+import shutil
+import tempfile
+import concurrent.futures
+import numpy as np
+import torch
 from datetime import datetime
-from pydub import AudioSegment
 from urllib.parse import urlparse, parse_qs
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 import openai
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+from faster_whisper.feature_extractor import FeatureExtractor
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from transcript_cache import transcript_key, load_transcript, store_transcript
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib json module
+    orjson = None
 
 # ================ Configuration ================
 DEFAULT_OUTPUT_DIR = "downloads"
-AUDIO_QUALITY = "320kbps"  # Best audio quality
+AUDIO_FORMAT = "opus"  # YouTube's own audio codec, so the audio is usually copied rather than re-encoded
+AUDIO_QUALITY = "0"  # Best VBR quality, for sources that do need re-encoding
+ARIA2C_ARGS = ['-x', '16', '-s', '16', '-k', '1M']  # Parallel connections when aria2c is installed
 SEGMENT_LENGTH = 20000  # 20 seconds in milliseconds
 SEGMENT_OVERLAP = 2000  # 2 seconds overlap in milliseconds
 
@@ -28,9 +49,31 @@ FOLDER_STRUCTURE = {
     'processed': 'processed'    # Final processed content
 }
 
+# Whisper Model Configuration
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "faster-whisper")  # "faster-whisper" or "whisper_cpp"
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL_NAME", "turbo")  # e.g. "large-v3" for best accuracy
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")  # "auto" (CUDA when available), "cuda" or "cpu"
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "")  # Empty: int8_float16 on CUDA, int8 on CPU
+WHISPER_CPP_MODEL_NAME = os.getenv("WHISPER_CPP_MODEL_NAME", "large-v3-turbo-q5_0")  # GGML weights
+WHISPER_NUM_WORKERS = 2
+WHISPER_BATCH_SIZE = 16  # Segments decoded together in one batched call
+# Silero VAD settings: non-speech audio is dropped before it reaches the encoder
+WHISPER_VAD_PARAMETERS = {
+    "threshold": 0.5,
+    "min_speech_duration_ms": 250,
+    "min_silence_duration_ms": 500
+}
+LEGACY_SPLIT = os.getenv("LEGACY_SPLIT", "0") == "1"  # Split audio into segment files even with faster-whisper
+JSON_LOAD_WORKERS = 16  # Threads reading segment JSON files when combining them
+
 # Local Model Configuration  
 LOCAL_MODEL_URL = "http://127.0.0.1:11434"
-LOCAL_MODEL_NAME = "deepseek-r1:32b"
+LOCAL_MODEL_NAME = os.getenv("LOCAL_MODEL_NAME", "deepseek-r1:32b")
+# Model for the chunks of transcripts too long for one call, e.g. a distilled
+# "deepseek-r1:7b"; the final merge call still uses LOCAL_MODEL_NAME
+LOCAL_FAST_MODEL_NAME = os.getenv("LOCAL_FAST_MODEL_NAME", LOCAL_MODEL_NAME)
+LLM_CHUNK_SIZE = 32000  # Max transcript characters per LLM call (~8k tokens)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))  # Chunks sent to the local model at once
 
 # HTML Template for Output
 HTML_TEMPLATE = """<!DOCTYPE html>
@@ -235,6 +278,91 @@ FINAL INSTRUCTION
 Output only the HTML content that will be placed between the <body> tags. Do not include the HTML template or any other wrapper code.
 """
 
+# Prompts for transcripts too long for one call. Each chunk is turned into
+# content sections only; one final call over the outline of all sections
+# writes the title and the Practice & Mastery section for the whole video.
+CHUNK_PROMPT_TEMPLATE = """The text between triple backticks below is one part of a longer raw video transcription. The other parts are processed separately and the results are joined in order. It may contain errors, repetitions, or incomplete sentences.
+
+```
+[PASTE TRANSCRIPTION HERE]
+```
+
+Your Role  
+Act as a world-class educator, cognitive scientist, and instructional designer combined. Your mission is to preserve every valuable idea in this part and enhance its clarity, memorability, and practical value.
+
+Strict Output Rules  
+- Output must be valid HTML
+- Use the following HTML structure and CSS classes:
+  - Main sections: <div class="section">
+  - Highlights: <span class="highlight">
+  - Emojis: <span class="emoji">
+  - Tables: Use proper <table>, <thead>, <tbody>, <tr>, <th>, and <td> tags
+- Do not include any introductory, transitional, or concluding phrases
+- Do not explain, elaborate on, or add from your own knowledge
+- Only use the content found within this part of the transcription
+
+OUTPUT INSTRUCTIONS
+
+Deep Comprehension & Full Extraction  
+- Read this part with attention to every unique idea, argument, concept, model, or paradigm  
+- Include all meaningful content, even if repeated. No summarization that omits ideas
+
+Break Down & Present Ideas Using Modern Techniques  
+1. Organize the content into sections with clear headers using <h2> and <h3> only. The <h1> title of the whole document is written separately  
+2. For each idea/concept:  
+   - Explain clearly and thoroughly using the transcription only  
+   - Use <span class="emoji"></span> for emojis and <span class="highlight"> for important points  
+   - Provide at least 3 real-life examples from diverse contexts to illustrate  
+   - Use tables to show contrasts, sequences, or relationships  
+   - If the speaker presents models, theories, or frameworks, include clear tables or structured summaries
+3. Do not write any questions, quizzes, or practice section. They are written separately for the whole video
+
+Language & Context  
+- Output must be in the same language as the transcription  
+- Accurately reflect any cultural, religious, or philosophical contexts or references—only from the transcription
+
+THINK STEP BY STEP. Be methodical, precise, and insightful.
+
+FINAL INSTRUCTION  
+Output only the HTML sections for this part. Do not include the HTML template or any other wrapper code.
+"""
+
+MERGE_PROMPT_TEMPLATE = """Below, between triple backticks, is the outline of a lesson built from a video transcription: its section headings (## and ###) and the key points highlighted in each section (-), in order.
+
+```
+[PASTE TRANSCRIPTION HERE]
+```
+
+Your Role  
+Act as a world-class educator, cognitive scientist, and instructional designer combined. The lesson sections are already written; your mission is to give the lesson its title and write its Practice & Mastery section.
+
+Strict Output Rules  
+- Output must be valid HTML
+- Use the following HTML structure and CSS classes:
+  - Main sections: <div class="section">
+  - Questions: <div class="question">
+  - Answers: <div class="answer">
+  - Highlights: <span class="highlight">
+  - Emojis: <span class="emoji">
+- Do not include any introductory or transitional phrases
+- Do not explain, elaborate on, or add from your own knowledge
+- Only use the content found within the outline
+
+OUTPUT INSTRUCTIONS
+
+1. Start with a single <h1> title for the whole lesson  
+2. Then write the Practice & Mastery Section, covering the whole outline:  
+   - 5 Conceptual Q&A: Deep, thoughtful questions with clear answers and explanations  
+   - 5 Multiple-Choice Questions: each with 4 options (A-D); indicate the correct answer and explain why it is correct and why the others are not  
+   - 5 Open-Ended Questions: encourage reflection, application, or debate, grounded strictly in the outline
+
+Language & Context  
+- Output must be in the same language as the outline
+
+FINAL INSTRUCTION  
+Output only the <h1> title followed by the Practice & Mastery section. Do not include the HTML template or any other wrapper code.
+"""
+
 # ================ Logging Setup ================
 def setup_logging() -> logging.Logger:
     """Set up logging configuration with both file and console output."""
@@ -258,6 +386,7 @@ def setup_logging() -> logging.Logger:
     return logger
 
 # ================ YouTube Download Functions ================
+@functools.lru_cache(maxsize=1024)
 def is_valid_youtube_url(url: str) -> bool:
     """Validate if the URL is a valid YouTube URL."""
     try:
@@ -289,10 +418,11 @@ def download_audio(url: str, output_dir: str, logger: logging.Logger) -> str:
     output_template = os.path.join(output_dir, f"{video_id}.%(ext)s")
     
     ydl_opts = {
-        'format': 'bestaudio/best',
+        # Prefer the Opus (webm) stream, which FFmpegExtractAudio only remuxes
+        'format': 'bestaudio[ext=webm]/bestaudio/best',
         'postprocessors': [{
             'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
+            'preferredcodec': AUDIO_FORMAT,
             'preferredquality': AUDIO_QUALITY,
         }],
         'outtmpl': output_template,
@@ -301,6 +431,9 @@ def download_audio(url: str, output_dir: str, logger: logging.Logger) -> str:
         'quiet': True,
         'no_warnings': True,
     }
+    if shutil.which('aria2c'):
+        ydl_opts['external_downloader'] = {'default': 'aria2c'}
+        ydl_opts['external_downloader_args'] = {'aria2c': ARIA2C_ARGS}
     
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -310,7 +443,7 @@ def download_audio(url: str, output_dir: str, logger: logging.Logger) -> str:
                 raise ValueError("Could not fetch video information")
             
             # Get the downloaded file path
-            audio_path = os.path.join(output_dir, f"{video_id}.mp3")
+            audio_path = os.path.join(output_dir, f"{video_id}.{AUDIO_FORMAT}")
             
             if not os.path.exists(audio_path):
                 raise FileNotFoundError("Audio file not found after download")
@@ -323,11 +456,25 @@ def download_audio(url: str, output_dir: str, logger: logging.Logger) -> str:
         raise
 
 # ================ Audio Processing Functions ================
+def _write_wav(path: str, samples: np.ndarray, sampling_rate: int) -> None:
+    """Write 16-bit mono PCM samples to a WAV file."""
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sampling_rate)
+        wav_file.writeframes(samples.tobytes())
+
 def split_audio(audio_path: str, output_dir: str, logger: logging.Logger) -> List[str]:
-    """Split audio file into segments and return list of segment paths."""
+    """Split audio file into segments and return list of segment paths.
+    
+    The file is decoded once to 16 kHz mono; segments are then written
+    straight from the decoded samples without further decoding or resampling.
+    """
     logger.info(f"Loading audio file: {audio_path}")
-    audio = AudioSegment.from_file(audio_path)
-    logger.info(f"Audio duration: {len(audio)/1000:.2f} seconds")
+    sampling_rate = 16000
+    audio = decode_audio(audio_path, sampling_rate=sampling_rate)
+    duration_ms = len(audio) * 1000 // sampling_rate
+    logger.info(f"Audio duration: {duration_ms/1000:.2f} seconds")
     
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -335,43 +482,497 @@ def split_audio(audio_path: str, output_dir: str, logger: logging.Logger) -> Lis
     step = SEGMENT_LENGTH - SEGMENT_OVERLAP
     segment_files = []
     
+    # Find speech once over the whole file; segments without any would
+    # only cost a transcription call
+    speech = [
+        (chunk["start"] * 1000 // sampling_rate, chunk["end"] * 1000 // sampling_rate)
+        for chunk in get_speech_timestamps(audio, VadOptions(**WHISPER_VAD_PARAMETERS))
+    ]
+    
+    # decode_audio scales 16-bit PCM to [-1, 1); scaling back is lossless
+    pcm = np.clip(audio * 32768, -32768, 32767).astype(np.int16)
+    del audio
+    
     logger.info(f"Splitting audio into {SEGMENT_LENGTH/1000:.1f}s segments with {SEGMENT_OVERLAP/1000:.1f}s overlap")
     
-    for i in range(0, len(audio), step):
-        segment = audio[i:i + SEGMENT_LENGTH]
-        if len(segment) < 1000:  # Skip segments shorter than 1 second
+    for i in range(0, duration_ms, step):
+        end = min(i + SEGMENT_LENGTH, duration_ms)
+        if end - i < 1000:  # Skip segments shorter than 1 second
+            continue
+        
+        if not any(start < end and stop > i for start, stop in speech):
+            logger.info(f"Skipped silent segment: {i/1000:.1f}s to {end/1000:.1f}s")
             continue
         
-        segment = segment.set_channels(1).set_frame_rate(16000)
         segment_path = os.path.join(output_dir, f"segment_{i//step:04d}.wav")
-        segment.export(segment_path, format="wav")
+        _write_wav(segment_path, pcm[i * sampling_rate // 1000:end * sampling_rate // 1000], sampling_rate)
         segment_files.append(segment_path)
-        logger.info(f"Saved segment {len(segment_files)}: {i/1000:.1f}s to {(i + len(segment))/1000:.1f}s")
+        logger.info(f"Saved segment {len(segment_files)}: {i/1000:.1f}s to {end/1000:.1f}s")
     
     return segment_files
 
 # ================ Transcription Functions ================
-def transcribe_segment(model: whisper.Whisper, segment_file: str, logger: logging.Logger) -> Dict:
-    """Transcribe a single audio segment using Whisper."""
+class TorchFeatureExtractor(FeatureExtractor):
+    """Log-mel feature extractor that runs the STFT and mel projection on a torch device.
+    
+    Drop-in replacement for faster-whisper's numpy extractor, which always
+    computes the spectrogram on the CPU. A 2-D [N, samples] batch of
+    equal-length waveforms is also accepted; its N spectrograms are then
+    computed in one batched STFT and normalized per waveform.
+    """
+    
+    def __init__(self, base: FeatureExtractor, device: str):
+        super().__init__(
+            feature_size=base.mel_filters.shape[0],
+            sampling_rate=base.sampling_rate,
+            hop_length=base.hop_length,
+            chunk_length=base.chunk_length,
+            n_fft=base.n_fft
+        )
+        self.device = device
+        self.window = torch.hann_window(self.n_fft, device=device)
+        self.mel_filters_tensor = torch.from_numpy(self.mel_filters).to(device)
+    
+    def __call__(self, waveform: np.ndarray, padding: int = 160, chunk_length: Optional[int] = None) -> np.ndarray:
+        if chunk_length is not None:
+            self.n_samples = chunk_length * self.sampling_rate
+            self.nb_max_frames = self.n_samples // self.hop_length
+        
+        audio = torch.from_numpy(np.asarray(waveform, dtype=np.float32)).to(self.device)
+        if padding:
+            audio = torch.nn.functional.pad(audio, (0, padding))
+        
+        stft = torch.stft(audio, self.n_fft, self.hop_length, window=self.window, return_complex=True)
+        magnitudes = stft[..., :-1].abs() ** 2
+        
+        mel_spec = self.mel_filters_tensor @ magnitudes
+        log_spec = torch.clamp(mel_spec, min=1e-10).log10()
+        log_spec = torch.maximum(log_spec, log_spec.amax(dim=(-2, -1), keepdim=True) - 8.0)
+        log_spec = (log_spec + 4.0) / 4.0
+        
+        return log_spec.cpu().numpy()
+
+_whisper_model = None
+_whisper_model_lock = threading.Lock()
+
+def get_whisper_model() -> WhisperModel:
+    """Return the process-wide faster-whisper model, loading it on first use.
+    
+    The model is shared by every worker thread; CTranslate2 releases the GIL
+    during inference and serves concurrent calls with its own workers.
+    """
+    global _whisper_model
+    if _whisper_model is None:
+        with _whisper_model_lock:
+            if _whisper_model is None:
+                _whisper_model = _load_whisper_model()
+    return _whisper_model
+
+def preload_whisper_model() -> None:
+    """Start loading the Whisper model in the background, if it isn't loaded yet.
+    
+    Lets the load overlap with the audio download; get_whisper_model then
+    waits for it. A failed load is retried (and raised) by get_whisper_model.
+    On CUDA the model is also warmed up, so the one-time GPU setup of the
+    first transcription happens during the download too.
+    """
+    if _whisper_model is None:
+        threading.Thread(target=_preload_whisper_model, daemon=True).start()
+
+def _preload_whisper_model() -> None:
+    try:
+        model = get_whisper_model()
+        if WHISPER_BACKEND != "whisper_cpp" and _whisper_cuda_devices() > 0:
+            _warm_up_whisper_model(model)
+    except Exception as e:
+        logging.getLogger('YouTubeTranscriber').warning(f"Background Whisper model load failed: {e}")
+
+def _warm_up_whisper_model(model: WhisperModel) -> None:
+    """Transcribe one second of silence to initialize cuBLAS, cuFFT and the CUDA allocator."""
+    segments, _ = model.transcribe(
+        np.zeros(model.feature_extractor.sampling_rate, dtype=np.float32),
+        language="en",
+        beam_size=1,
+        temperature=0.0,
+        without_timestamps=True,
+        vad_filter=False
+    )
+    for _ in segments:  # Decoding happens while iterating
+        pass
+
+def get_whisper_parallelism() -> int:
+    """Number of transcription calls the shared model can serve concurrently."""
+    if WHISPER_BACKEND == "whisper_cpp":
+        return 1  # A whisper.cpp context runs one transcription at a time
+    return WHISPER_NUM_WORKERS * max(_whisper_cuda_devices(), 1)
+
+def _whisper_cuda_devices() -> int:
+    """Number of CUDA devices the faster-whisper model is loaded on, per WHISPER_DEVICE."""
+    if WHISPER_DEVICE == "cpu":
+        return 0
+    cuda_devices = ctranslate2.get_cuda_device_count()
+    if WHISPER_DEVICE == "cuda" and cuda_devices == 0:
+        raise RuntimeError("WHISPER_DEVICE is 'cuda' but CTranslate2 sees no CUDA device")
+    return cuda_devices
+
+def _load_whisper_model() -> WhisperModel:
+    """Load the faster-whisper model on the best available device(s).
+    
+    With several GPUs the model is replicated on each one and concurrent
+    transcribe calls are dispatched across the replicas.
+    """
+    if WHISPER_BACKEND == "whisper_cpp":
+        return _load_whisper_cpp_model()
+    
+    cuda_devices = _whisper_cuda_devices()
+    if cuda_devices > 0:
+        device, compute_type = "cuda", "int8_float16"
+    else:
+        device, compute_type = "cpu", "int8"
+    compute_type = WHISPER_COMPUTE_TYPE or compute_type
+    model = WhisperModel(
+        WHISPER_MODEL_NAME,
+        device=device,
+        device_index=list(range(cuda_devices)) if cuda_devices > 1 else 0,
+        compute_type=compute_type,
+        num_workers=WHISPER_NUM_WORKERS
+    )
+    if device == "cuda" and torch.cuda.is_available():
+        model.feature_extractor = TorchFeatureExtractor(model.feature_extractor, "cuda")
+    return model
+
+def _load_whisper_cpp_model():
+    """Load a GGML-quantized whisper.cpp model.
+    
+    Runs on all CPU cores; CUDA/Metal offload is used when pywhispercpp was
+    built with it. pywhispercpp is an optional dependency.
+    """
+    from pywhispercpp.model import Model
+    return Model(
+        WHISPER_CPP_MODEL_NAME,
+        n_threads=os.cpu_count(),
+        print_progress=False,
+        print_realtime=False
+    )
+
+def _transcribe_segment_cpp(model, segment_file: str) -> Dict:
+    """Transcribe a single audio segment using whisper.cpp."""
+    # whisper.cpp reports t0/t1 in 10 ms units
+    result = {
+        "segments": [
+            {"start": segment.t0 / 100, "end": segment.t1 / 100, "text": segment.text}
+            for segment in model.transcribe(segment_file)
+        ]
+    }
+    result["text"] = "".join(segment["text"] for segment in result["segments"])
+    return result
+
+def transcribe_segment(model: WhisperModel, segment_file: str, logger: logging.Logger) -> Dict:
+    """Transcribe a single audio segment using the configured Whisper backend."""
     logger.info(f"Transcribing file: {segment_file}")
     
-    result = model.transcribe(
+    if WHISPER_BACKEND == "whisper_cpp":
+        result = _transcribe_segment_cpp(model, segment_file)
+        logger.info(f"Transcription complete for {segment_file}")
+        return result
+    
+    segments, info = model.transcribe(
         segment_file,
         # language="ar",
         task="transcribe",
-        verbose=True,
-        fp16=False,
+        beam_size=1,
         temperature=0.0,
         condition_on_previous_text=False,
         no_speech_threshold=0.6,
         compression_ratio_threshold=2.4,
-        logprob_threshold=-1.0,
-        word_timestamps=True
+        log_prob_threshold=-1.0,
+        word_timestamps=False,  # Only segment timings are saved; word timings cost an extra alignment pass
+        vad_filter=True,
+        vad_parameters=WHISPER_VAD_PARAMETERS
     )
     
+    # faster-whisper yields segments lazily; decoding happens while iterating
+    result = {
+        "language": info.language,
+        "segments": [
+            {"start": segment.start, "end": segment.end, "text": segment.text}
+            for segment in segments
+        ]
+    }
+    result["text"] = "".join(segment["text"] for segment in result["segments"])
+    
     logger.info(f"Transcription complete for {segment_file}")
     return result
 
+def transcribe_segments_batched(model: WhisperModel, segment_files: List[str], logger: logging.Logger) -> List[Dict]:
+    """Transcribe several audio segments in a single batched faster-whisper call.
+    
+    The segments are laid end to end in one buffer and handed to the batched
+    pipeline as clip timestamps, so they are encoded and decoded together.
+    Results are split back per input file with timestamps relative to it.
+    """
+    if WHISPER_BACKEND == "whisper_cpp":
+        # whisper.cpp has no batched pipeline; transcribe the files in turn
+        return [transcribe_segment(model, segment_file, logger) for segment_file in segment_files]
+    
+    logger.info(f"Batch transcribing {len(segment_files)} segment(s)")
+    
+    sampling_rate = model.feature_extractor.sampling_rate
+    audios = [decode_audio(segment_file, sampling_rate=sampling_rate) for segment_file in segment_files]
+    
+    clip_timestamps = []
+    offset = 0
+    for audio in audios:
+        clip_timestamps.append({"start": offset, "end": offset + len(audio)})
+        offset += len(audio)
+    
+    segments, info = BatchedInferencePipeline(model=model).transcribe(
+        np.concatenate(audios),
+        task="transcribe",
+        beam_size=1,
+        temperature=0.0,
+        condition_on_previous_text=False,
+        no_speech_threshold=0.6,
+        compression_ratio_threshold=2.4,
+        log_prob_threshold=-1.0,
+        word_timestamps=False,  # Only segment timings are saved; word timings cost an extra alignment pass
+        vad_filter=False,
+        clip_timestamps=clip_timestamps,
+        batch_size=WHISPER_BATCH_SIZE
+    )
+    
+    clip_starts = [clip["start"] / sampling_rate for clip in clip_timestamps]
+    results = [{"language": info.language, "segments": []} for _ in segment_files]
+    for segment in segments:
+        # Bucket on the midpoint so rounding at clip edges can't misplace a segment
+        index = max(bisect.bisect_right(clip_starts, (segment.start + segment.end) / 2) - 1, 0)
+        clip_start = clip_starts[index]
+        results[index]["segments"].append({
+            "start": segment.start - clip_start,
+            "end": segment.end - clip_start,
+            "text": segment.text
+        })
+    
+    for result in results:
+        result["text"] = "".join(segment["text"] for segment in result["segments"])
+    
+    logger.info(f"Batch transcription complete for {len(segment_files)} segment(s)")
+    return results
+
+def _transcript_cache_settings(layout: str) -> Tuple[str, Dict]:
+    """Model name and parameters identifying a transcription in the transcript cache.
+    
+    layout is "segment" for a split segment file, "window" for a full audio
+    file bucketed into SEGMENT_LENGTH windows.
+    """
+    if WHISPER_BACKEND == "whisper_cpp":
+        return WHISPER_CPP_MODEL_NAME, {"backend": WHISPER_BACKEND, "layout": layout}
+    return WHISPER_MODEL_NAME, {
+        "backend": WHISPER_BACKEND,
+        "compute_type": WHISPER_COMPUTE_TYPE,
+        "language": None,
+        "task": "transcribe",
+        "vad_parameters": WHISPER_VAD_PARAMETERS,
+        "layout": layout,
+        "window_ms": SEGMENT_LENGTH
+    }
+
+def transcribe_segments(model: WhisperModel, segment_files: List[str], transcription_path: Callable[[int], str],
+                        logger: logging.Logger,
+                        on_progress: Optional[Callable[[int, int], None]] = None) -> List[str]:
+    """Transcribe all segments lacking a JSON transcription, in parallel batches.
+    
+    transcription_path(i) gives the JSON path for segment i. Segments found
+    in the transcript cache are not transcribed again.
+    Returns the list of segment JSON paths. `on_progress(done, total)` is
+    called after each batch is saved.
+    """
+    total = len(segment_files)
+    pending = [i for i in range(total) if not os.path.exists(transcription_path(i))]
+    if len(pending) < total:
+        logger.info(f"Found {total - len(pending)} existing segment transcriptions. Using them...")
+    
+    model_name, params = _transcript_cache_settings("segment")
+    cache_keys = {}
+    uncached = []
+    for i in pending:
+        cache_keys[i] = transcript_key(segment_files[i], model_name, params)
+        cached = load_transcript(cache_keys[i])
+        if cached is None:
+            uncached.append(i)
+        else:
+            save_segment_json(cached, transcription_path(i), i + 1, logger)
+    if len(uncached) < len(pending):
+        logger.info(f"Loaded {len(pending) - len(uncached)} segment transcriptions from the cache")
+    pending = uncached
+    
+    batches = [pending[i:i + WHISPER_BATCH_SIZE] for i in range(0, len(pending), WHISPER_BATCH_SIZE)]
+    done = total - len(pending)
+    if not batches:
+        return [transcription_path(i) for i in range(total)]
+    
+    # Keep every model worker (and every GPU replica) busy with its own batch
+    max_workers = min(get_whisper_parallelism(), len(batches))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as seg_pool:
+        futures = {
+            seg_pool.submit(transcribe_segments_batched, model, [segment_files[i] for i in batch], logger): batch
+            for batch in batches
+        }
+        for future in concurrent.futures.as_completed(futures):
+            batch = futures[future]
+            for i, result in zip(batch, future.result()):
+                save_segment_json(result, transcription_path(i), i + 1, logger)
+                store_transcript(cache_keys[i], model_name, params, result)
+            
+            done += len(batch)
+            logger.info(f"Transcribed {done}/{total} segments")
+            if on_progress:
+                on_progress(done, total)
+    
+    _flush_to_disk()
+    return [transcription_path(i) for i in range(total)]
+
+def needs_audio_split(legacy_split: bool = LEGACY_SPLIT) -> bool:
+    """Whether transcription works on split segment files rather than the whole audio.
+    
+    Only whisper.cpp needs the split, or legacy_split when asked for;
+    faster-whisper's batched pipeline chunks the full audio itself.
+    """
+    return legacy_split or WHISPER_BACKEND == "whisper_cpp"
+
+def transcribe_audio(model: WhisperModel, audio_file: str, transcription_path: Callable[[int], str],
+                     logger: logging.Logger,
+                     on_progress: Optional[Callable[[int, int], None]] = None) -> List[str]:
+    """Transcribe a whole audio file with the batched pipeline, without splitting it on disk.
+    
+    BatchedInferencePipeline finds speech with its own VAD and decodes the
+    chunks in batches. The resulting segments are bucketed into
+    SEGMENT_LENGTH windows and saved in the same segment JSON layout as
+    transcribe_segments, so combining them is unchanged. Windows saved by
+    an interrupted run are kept and transcription resumes after them.
+    A complete transcription is also stored in the transcript cache and
+    reused for the same audio.
+    
+    transcription_path(i) gives the JSON path for window i. Returns the
+    list of window JSON paths. `on_progress(done, total)` is called after
+    each window is saved.
+    """
+    # Only a run starting from scratch consults and fills the cache
+    model_name, params = _transcript_cache_settings("window")
+    cache_key = None
+    if not os.path.exists(transcription_path(0)):
+        cache_key = transcript_key(audio_file, model_name, params)
+        cached = load_transcript(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached transcription of {audio_file}")
+            for i, result in enumerate(cached):
+                save_segment_json(result, transcription_path(i), i + 1, logger)
+                if on_progress:
+                    on_progress(i + 1, len(cached))
+            return [transcription_path(i) for i in range(len(cached))]
+    
+    sampling_rate = model.feature_extractor.sampling_rate
+    audio = decode_audio(audio_file, sampling_rate=sampling_rate)
+    window = SEGMENT_LENGTH / 1000
+    total = max(math.ceil(len(audio) / sampling_rate / window), 1)
+    logger.info(f"Audio duration: {len(audio) / sampling_rate:.2f} seconds ({total} windows)")
+    
+    done = 0
+    while done < total and os.path.exists(transcription_path(done)):
+        done += 1
+    if done:
+        logger.info(f"Found {done} existing window transcriptions. Resuming after them...")
+    if done == total:
+        return [transcription_path(i) for i in range(total)]
+    
+    offset = done * window
+    if done:
+        # Segments are bucketed by start time, so the last saved one may run
+        # past its window; resume after it so its tail isn't transcribed twice
+        last_segments = _read_json(transcription_path(done - 1))["segments"]
+        if last_segments:
+            offset = max(offset, (done - 1) * window + last_segments[-1]["end"])
+    segments, info = BatchedInferencePipeline(model=model).transcribe(
+        audio[int(offset * sampling_rate):],
+        task="transcribe",
+        beam_size=1,
+        temperature=0.0,
+        condition_on_previous_text=False,
+        no_speech_threshold=0.6,
+        compression_ratio_threshold=2.4,
+        log_prob_threshold=-1.0,
+        word_timestamps=False,  # Only segment timings are saved; word timings cost an extra alignment pass
+        vad_filter=True,
+        vad_parameters=dict(WHISPER_VAD_PARAMETERS),
+        batch_size=WHISPER_BATCH_SIZE
+    )
+    
+    current = {"language": info.language, "segments": []}
+    results = []
+    
+    def save_windows(until: int) -> None:
+        # Save every window before `until`; empty ones too, so resuming can
+        # rely on the saved windows being contiguous
+        nonlocal done, current
+        while done < until:
+            current["text"] = "".join(segment["text"] for segment in current["segments"])
+            save_segment_json(current, transcription_path(done), done + 1, logger)
+            results.append(current)
+            done += 1
+            current = {"language": info.language, "segments": []}
+            logger.info(f"Transcribed {done}/{total} windows")
+            if on_progress:
+                on_progress(done, total)
+    
+    # Segments arrive in order, so a segment starting in a later window
+    # means every window before it is complete
+    for segment in segments:
+        start, end = segment.start + offset, segment.end + offset
+        save_windows(min(int(start // window), total - 1))
+        window_start = done * window
+        current["segments"].append({
+            "start": start - window_start,
+            "end": end - window_start,
+            "text": segment.text
+        })
+    save_windows(total)
+    store_transcript(cache_key, model_name, params, results)
+    _flush_to_disk()
+    
+    return [transcription_path(i) for i in range(total)]
+
+def _write_json(path: str, data: Dict) -> None:
+    """Write data to path as indented UTF-8 JSON.
+    
+    The file is written to a uniquely named temporary file next to path and
+    renamed into place, so a crash never leaves a truncated file behind and
+    concurrent writers of the same path don't share a temporary file. It
+    isn't fsynced; see _flush_to_disk.
+    """
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _flush_to_disk() -> None:
+    """Flush written files to disk with one sync rather than an fsync per file."""
+    if hasattr(os, 'sync'):  # Not available on Windows
+        os.sync()
+
+def _read_json(path: str) -> Dict:
+    """Read a UTF-8 JSON file."""
+    with open(path, 'rb') as f:
+        payload = f.read()
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
 def save_segment_json(transcription: Dict, output_path: str, segment_num: int, logger: logging.Logger) -> None:
     """Save a single segment transcription to a JSON file."""
     logger.info(f"Saving segment JSON to: {output_path}")
@@ -389,29 +990,32 @@ def save_segment_json(transcription: Dict, output_path: str, segment_num: int, l
         ]
     }
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(segment_data, f, ensure_ascii=False, indent=2)
+    _write_json(output_path, segment_data)
     
     logger.info(f"Segment JSON saved successfully to {output_path}")
 
+def _load_segment_json(segment_file: str, logger: logging.Logger) -> Optional[Dict]:
+    """Load one segment JSON file, returning None if it can't be read."""
+    try:
+        return _read_json(segment_file)
+    except Exception as e:
+        logger.error(f"Error loading segment file {segment_file}: {e}")
+        return None
+
 def combine_transcriptions(segment_files: List[str], output_path: str, logger: logging.Logger) -> None:
-    """Combine all segment JSON files into a single JSON file."""
-    logger.info(f"Combining JSON transcriptions to: {output_path}")
+    """Combine all segment JSON files into a single JSON file.
     
-    combined_data = {"segments": []}
+    The files are read concurrently; reading them is mostly waiting on disk.
+    """
+    logger.info(f"Combining JSON transcriptions to: {output_path}")
     
-    for segment_file in segment_files:
-        try:
-            with open(segment_file, 'r', encoding='utf-8') as f:
-                segment_data = json.load(f)
-                combined_data["segments"].append(segment_data)
-        except Exception as e:
-            logger.error(f"Error loading segment file {segment_file}: {e}")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=JSON_LOAD_WORKERS) as load_pool:
+        loaded = load_pool.map(lambda segment_file: _load_segment_json(segment_file, logger), segment_files)
+        combined_data = {"segments": [segment_data for segment_data in loaded if segment_data is not None]}
     
     combined_data["segments"].sort(key=lambda x: x["segment_number"])
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(combined_data, f, ensure_ascii=False, indent=2)
+    _write_json(output_path, combined_data)
     
     logger.info(f"Combined JSON saved successfully to {output_path}")
 
@@ -419,8 +1023,7 @@ def extract_text_from_json(json_file_path: str, output_file_path: str, logger: l
     """Extract text from JSON transcription and save to text file."""
     logger.info(f"Extracting text from JSON: {json_file_path}")
     
-    with open(json_file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = _read_json(json_file_path)
     
     full_text = []
     for segment in data['segments']:
@@ -435,76 +1038,179 @@ def extract_text_from_json(json_file_path: str, output_file_path: str, logger: l
     logger.info(f"Text extracted and saved to: {output_file_path}")
 
 # ================ LLM Processing Functions ================
+_THINK_RE = re.compile(r'<think>.*?</think>', flags=re.DOTALL | re.IGNORECASE)
+_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n')
+
 def clean_thinking_tags(content: str, logger: logging.Logger) -> str:
     """Remove thinking tags and their content from the LLM response."""
     if not content:
         return content
     
+    # Most responses have no thinking block; skip the regex passes for them
+    if '<think>' not in content.lower():
+        return content.strip()
+    
     # Remove <think>...</think> tags and everything between them
     # This handles both single line and multiline thinking blocks
-    cleaned_content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL | re.IGNORECASE)
+    cleaned_content, thinking_blocks = _THINK_RE.subn('', content)
     
     # Remove any extra whitespace left by removing thinking blocks
-    cleaned_content = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned_content)
+    cleaned_content = _BLANK_LINES_RE.sub('\n\n', cleaned_content)
     cleaned_content = cleaned_content.strip()
     
     # Log if thinking content was found and removed
-    if content != cleaned_content:
-        thinking_blocks = re.findall(r'<think>.*?</think>', content, flags=re.DOTALL | re.IGNORECASE)
-        logger.info(f"Removed {len(thinking_blocks)} thinking block(s) from LLM response")
+    if thinking_blocks:
+        logger.info(f"Removed {thinking_blocks} thinking block(s) from LLM response")
     
     return cleaned_content
 
-def process_transcription_with_llm(transcription_text: str, prompt_template: str, logger: logging.Logger) -> str:
-    """Process the transcription using the local model via OpenAI-compatible API."""
+def split_transcript(text: str, chunk_size: int) -> List[str]:
+    """Split a transcript into chunks of at most chunk_size characters, on line boundaries."""
+    chunks = []
+    current = []
+    current_length = 0
+    
+    for line in text.split('\n'):
+        # Lines longer than a chunk are cut into chunk-sized pieces
+        for start in range(0, max(len(line), 1), chunk_size):
+            piece = line[start:start + chunk_size]
+            if current and current_length + len(piece) + 1 > chunk_size:
+                chunks.append('\n'.join(current))
+                current, current_length = [], 0
+            current.append(piece)
+            current_length += len(piece) + 1
+    
+    if current:
+        chunks.append('\n'.join(current))
+    
+    # Blank chunks (e.g. from trailing newlines) would only waste an LLM call
+    return [chunk for chunk in chunks if chunk.strip()] or [text]
+
+async def process_chunk_with_llm(client: openai.AsyncOpenAI, transcription_text: str, prompt_template: str,
+                                 logger: logging.Logger, model_name: str = LOCAL_MODEL_NAME) -> str:
+    """Send one transcript chunk to the local model and return the cleaned HTML.
+    
+    The response is streamed, so tokens are collected as the model produces
+    them rather than in a single response at the end.
+    """
     
     # Replace the placeholder in the prompt with the actual transcription
     full_prompt = prompt_template.replace("[PASTE TRANSCRIPTION HERE]", transcription_text)
     
-    logger.info(f"Sending transcription to local model at {LOCAL_MODEL_URL}...")
+    stream = await client.chat.completions.create(
+        model=model_name,
+        messages=[
+            {
+                "role": "system", 
+                "content": "You are a world-class educator, cognitive scientist, and instructional designer. Follow the instructions precisely and output only the requested structured content."
+            },
+            {
+                "role": "user", 
+                "content": full_prompt
+            }
+        ],
+        temperature=0.3,
+        max_tokens=32768,
+        stream=True
+    )
+    
+    # Collect the streamed content
+    parts = []
+    async for chunk in stream:
+        if chunk.choices:
+            parts.append(chunk.choices[0].delta.content or "")
+    raw_content = "".join(parts)
+    
+    # Remove thinking tags and their content
+    cleaned_content = clean_thinking_tags(raw_content, logger)
+    
+    # If the content is wrapped in JSON, try to extract the HTML content
+    if cleaned_content.startswith('{'):
+        try:
+            json_response = json.loads(cleaned_content)
+            if 'choices' in json_response and len(json_response['choices']) > 0:
+                if 'message' in json_response['choices'][0]:
+                    cleaned_content = json_response['choices'][0]['message']['content']
+        except json.JSONDecodeError:
+            pass
+    
+    return cleaned_content
+
+_OUTLINE_RE = re.compile(r'<(h[23])[^>]*>(.*?)</\1>|<span class="highlight">(.*?)</span>',
+                         flags=re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_H1_END_RE = re.compile(r'</h1\s*>', flags=re.IGNORECASE)
+
+def outline_sections(sections_html: str) -> str:
+    """Reduce generated HTML sections to their headings and highlighted points, one per line."""
+    lines = []
+    for match in _OUTLINE_RE.finditer(sections_html):
+        heading_tag, heading, highlight = match.groups()
+        text = ' '.join(_TAG_RE.sub('', heading if heading_tag else highlight).split())
+        if not text:
+            continue
+        if heading_tag:
+            lines.append(f"{'#' * int(heading_tag[1])} {text}")
+        else:
+            lines.append(f"- {text}")
+    return '\n'.join(lines)
+
+async def process_transcription_with_llm(transcription_text: str, prompt_template: str, logger: logging.Logger,
+                                         chunk_size: Optional[int] = LLM_CHUNK_SIZE,
+                                         model_name: Optional[str] = None) -> str:
+    """Process the transcription using the local model via OpenAI-compatible API.
+    
+    Transcripts longer than chunk_size characters are split into chunks so
+    each prompt fits the model's context window. prompt_template is then
+    not used: up to LLM_CONCURRENCY chunks are turned into content sections
+    concurrently with CHUNK_PROMPT_TEMPLATE, and a final call with
+    MERGE_PROMPT_TEMPLATE over their outline writes the title and the
+    Practice & Mastery section. Pass chunk_size=None to send it in one call.
+    
+    By default the chunks go to LOCAL_FAST_MODEL_NAME, while a single call
+    and the merge call go to LOCAL_MODEL_NAME; model_name overrides both.
+    
+    This is a coroutine; synchronous callers run it with asyncio.run().
+    """
+    chunks = split_transcript(transcription_text, chunk_size) if chunk_size else [transcription_text]
+    chunk_model = model_name or (LOCAL_FAST_MODEL_NAME if len(chunks) > 1 else LOCAL_MODEL_NAME)
+    model_name = model_name or LOCAL_MODEL_NAME
+    
+    logger.info(f"Sending transcription to {chunk_model} at {LOCAL_MODEL_URL} in {len(chunks)} chunk(s)...")
     
     # Initialize OpenAI client pointing to local model
-    client = openai.OpenAI(
+    client = openai.AsyncOpenAI(
         base_url=f"{LOCAL_MODEL_URL}/v1",
         api_key="not-needed"  # Local models typically don't need real API keys
     )
     
     try:
-        response = client.chat.completions.create(
-            model=LOCAL_MODEL_NAME,
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are a world-class educator, cognitive scientist, and instructional designer. Follow the instructions precisely and output only the requested structured content."
-                },
-                {
-                    "role": "user", 
-                    "content": full_prompt
-                }
-            ],
-            temperature=0.3,
-            max_tokens=32768
-        )
-        
-        # Extract the content from the response
-        raw_content = response.choices[0].message.content
-        
-        # Remove thinking tags and their content
-        cleaned_content = clean_thinking_tags(raw_content, logger)
+        async with client:
+            if len(chunks) == 1:
+                result = await process_chunk_with_llm(client, chunks[0], prompt_template, logger, model_name)
+                logger.info("Successfully processed transcription with local model")
+                return result
+            
+            semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+            
+            async def process_chunk(i: int, chunk: str) -> str:
+                async with semaphore:
+                    logger.info(f"Processing chunk {i + 1}/{len(chunks)} ({len(chunk)} characters)")
+                    return await process_chunk_with_llm(client, chunk, CHUNK_PROMPT_TEMPLATE, logger, chunk_model)
+            
+            sections = '\n'.join(await asyncio.gather(*(process_chunk(i, chunk) for i, chunk in enumerate(chunks))))
+            
+            # Models that ignore the markup still get a (truncated) outline
+            outline = outline_sections(sections) or ' '.join(_TAG_RE.sub(' ', sections).split())[:chunk_size]
+            logger.info(f"Writing title and practice section with {model_name} from a {len(outline)} character outline")
+            merged = await process_chunk_with_llm(client, outline, MERGE_PROMPT_TEMPLATE, logger, model_name)
         
-        # If the content is wrapped in JSON, try to extract the HTML content
-        if cleaned_content.startswith('{'):
-            try:
-                import json
-                json_response = json.loads(cleaned_content)
-                if 'choices' in json_response and len(json_response['choices']) > 0:
-                    if 'message' in json_response['choices'][0]:
-                        cleaned_content = json_response['choices'][0]['message']['content']
-            except json.JSONDecodeError:
-                pass
+        # The title goes above the sections, the practice section below them
+        title_end = _H1_END_RE.search(merged)
+        title, practice = (merged[:title_end.end()], merged[title_end.end():]) if title_end else ('', merged)
         
         logger.info("Successfully processed transcription with local model")
-        return cleaned_content
+        return '\n'.join(part.strip() for part in (title, sections, practice) if part.strip())
         
     except Exception as e:
         logger.error(f"Error calling local model: {e}")
@@ -519,9 +1225,9 @@ def generate_html(transcription: str, output_path: str) -> None:
             content=transcription
         )
         
-        # Save HTML file
-        with open(output_path, 'w', encoding='utf-8') as html_file:
-            html_file.write(html_content)
+        # Save HTML file in a single write
+        with open(output_path, 'wb') as html_file:
+            html_file.write(html_content.encode('utf-8'))
         logging.info(f"HTML file saved at: {output_path}")
         
     except Exception as e:
@@ -529,6 +1235,7 @@ def generate_html(transcription: str, output_path: str) -> None:
         raise
 
 # ================ Folder Management Functions ================
+@functools.lru_cache(maxsize=1024)
 def get_video_id(url: str) -> str:
     """Extract video ID from YouTube URL."""
     parsed = urlparse(url)
@@ -550,30 +1257,51 @@ def setup_folder_structure(base_dir: str, video_id: str) -> dict:
     if not os.path.exists(video_dir):
         os.makedirs(video_dir)
     
-    # Create and store paths for each folder type
+    # Create and store paths for each folder type. The segments folder is
+    # only needed when the audio is split, so split_audio creates it.
     for folder_type, folder_name in FOLDER_STRUCTURE.items():
         folder_path = os.path.join(video_dir, folder_name)
-        if not os.path.exists(folder_path):
+        if folder_type != 'segments' and not os.path.exists(folder_path):
             os.makedirs(folder_path)
         folders[folder_type] = folder_path
     
     return folders
 
+def get_audio_path(audio_dir: str, video_id: str) -> str:
+    """Return the audio file path for a video, keeping MP3 files downloaded by earlier versions."""
+    legacy_path = os.path.join(audio_dir, f"{video_id}.mp3")
+    if os.path.exists(legacy_path):
+        return legacy_path
+    return os.path.join(audio_dir, f"{video_id}.{AUDIO_FORMAT}")
+
 def get_output_paths(folders: dict, video_id: str) -> dict:
     """Generate all output file paths for a video."""
     return {
         'video': os.path.join(folders['video'], f"{video_id}.mp4"),
-        'audio': os.path.join(folders['audio'], f"{video_id}.mp3"),
-        'segments': [os.path.join(folders['segments'], f"segment_{i:04d}.wav") 
-                    for i in range(1000)],  # Assuming max 1000 segments
-        'transcriptions': [os.path.join(folders['transcriptions'], f"segment_{i:04d}.json") 
-                          for i in range(1000)],
+        'audio': get_audio_path(folders['audio'], video_id),
+        # Per-segment paths are built on demand: output_paths['transcriptions'](i)
+        'transcriptions': lambda i: os.path.join(folders['transcriptions'], f"segment_{i:04d}.json"),
         'full_transcript_json': os.path.join(folders['full_transcriptions'], "transcript.json"),
         'full_transcript_txt': os.path.join(folders['full_transcriptions'], "full_text.txt"),
         'processed_content': os.path.join(folders['processed'], "processed_content.txt"),
         'processed_html': os.path.join(folders['processed'], "processed_content.html")
     }
 
+def find_existing_files(folder: str, extension: str) -> List[str]:
+    """Return the segment_NNNN files with the given extension in folder, in segment order.
+    
+    Uses a single directory scan rather than checking each possible path.
+    """
+    try:
+        with os.scandir(folder) as entries:
+            names = [entry.name for entry in entries
+                     if entry.name.startswith("segment_") and entry.name.endswith(extension)]
+    except FileNotFoundError:
+        return []
+    # Longer names sort last, so numbers past the zero padding stay in order
+    names.sort(key=lambda name: (len(name), name))
+    return [os.path.join(folder, name) for name in names]
+
 def is_video_processed(output_paths: dict) -> bool:
     """Check if video has already been fully processed."""
     required_files = [
@@ -585,8 +1313,13 @@ def is_video_processed(output_paths: dict) -> bool:
     return all(os.path.exists(path) for path in required_files)
 
 # ================ Main Processing Function ================
-def process_youtube_audio(url: str, output_base_dir: str = DEFAULT_OUTPUT_DIR) -> None:
-    """Main function to process YouTube audio: download, transcribe, and generate text."""
+def process_youtube_audio(url: str, output_base_dir: str = DEFAULT_OUTPUT_DIR,
+                          legacy_split: bool = LEGACY_SPLIT) -> None:
+    """Main function to process YouTube audio: download, transcribe, and generate text.
+    
+    With legacy_split the audio is split into overlapping segment files that
+    are transcribed separately, instead of transcribing the full audio.
+    """
     logger = setup_logging()
     
     try:
@@ -599,6 +1332,10 @@ def process_youtube_audio(url: str, output_base_dir: str = DEFAULT_OUTPUT_DIR) -
         folders = setup_folder_structure(output_base_dir, video_id)
         output_paths = get_output_paths(folders, video_id)
         
+        # Load the model while the audio downloads
+        if not os.path.exists(output_paths['full_transcript_json']):
+            preload_whisper_model()
+        
         # Step 1: Download audio
         logger.info("Step 1: Downloading audio...")
         if not os.path.exists(output_paths['audio']):
@@ -610,33 +1347,27 @@ def process_youtube_audio(url: str, output_base_dir: str = DEFAULT_OUTPUT_DIR) -
         
         # Step 2: Split audio into segments
         logger.info("\nStep 2: Splitting audio into segments...")
-        existing_segments = [f for f in output_paths['segments'] if os.path.exists(f)]
-        if not existing_segments:
-            segment_files = split_audio(audio_file, folders['segments'], logger)
-            logger.info(f"Created {len(segment_files)} audio segments")
+        if not needs_audio_split(legacy_split):
+            logger.info("Not needed: the full audio is transcribed with the batched pipeline")
         else:
-            logger.info(f"Found {len(existing_segments)} existing audio segments. Using them...")
-            segment_files = existing_segments
+            existing_segments = find_existing_files(folders['segments'], ".wav")
+            if not existing_segments:
+                segment_files = split_audio(audio_file, folders['segments'], logger)
+                logger.info(f"Created {len(segment_files)} audio segments")
+            else:
+                logger.info(f"Found {len(existing_segments)} existing audio segments. Using them...")
+                segment_files = existing_segments
         
         # Step 3: Initialize Whisper model
         logger.info("\nStep 3: Initializing Whisper model...")
-        model = whisper.load_model("turbo")
+        model = get_whisper_model()
         
         # Step 4: Transcribe segments
         logger.info("\nStep 4: Transcribing segments...")
-        segment_json_files = []
-        for i, segment_file in enumerate(segment_files):
-            transcription_path = output_paths['transcriptions'][i]
-            if os.path.exists(transcription_path):
-                logger.info(f"Transcription for segment {i + 1} already exists. Using existing transcription...")
-                segment_json_files.append(transcription_path)
-                continue
-                
-            logger.info(f"\nProcessing segment {i + 1}/{len(segment_files)}")
-            result = transcribe_segment(model, segment_file, logger)
-            save_segment_json(result, transcription_path, i + 1, logger)
-            segment_json_files.append(transcription_path)
-            logger.info(f"Saved transcription for segment {i + 1}")
+        if needs_audio_split(legacy_split):
+            segment_json_files = transcribe_segments(model, segment_files, output_paths['transcriptions'], logger)
+        else:
+            segment_json_files = transcribe_audio(model, audio_file, output_paths['transcriptions'], logger)
         
         # Step 5: Combine transcriptions
         logger.info("\nStep 5: Combining transcriptions...")
@@ -656,6 +1387,7 @@ def process_youtube_audio(url: str, output_base_dir: str = DEFAULT_OUTPUT_DIR) -
         
         # Step 7: Process transcription with LLM
         logger.info("\nStep 7: Processing transcription with LLM...")
+        processed_content = None
         if not os.path.exists(output_paths['processed_content']):
             prompt_template = PROMPT_TEMPLATE
             
@@ -663,7 +1395,7 @@ def process_youtube_audio(url: str, output_base_dir: str = DEFAULT_OUTPUT_DIR) -
             with open(output_paths['full_transcript_txt'], 'r', encoding='utf-8') as f:
                 transcription_text = f.read()
             
-            processed_content = process_transcription_with_llm(transcription_text, prompt_template, logger)
+            processed_content = asyncio.run(process_transcription_with_llm(transcription_text, prompt_template, logger))
             
             # Save the processed content
             with open(output_paths['processed_content'], 'w', encoding='utf-8') as f:
@@ -671,12 +1403,13 @@ def process_youtube_audio(url: str, output_base_dir: str = DEFAULT_OUTPUT_DIR) -
             logger.info("Created processed content file")
         else:
             logger.info("Processed content already exists. Using existing file...")
-            with open(output_paths['processed_content'], 'r', encoding='utf-8') as f:
-                processed_content = f.read()
         
         # Step 8: Create HTML from processed content
         logger.info("\nStep 8: Creating HTML from processed content...")
         if not os.path.exists(output_paths['processed_html']):
+            if processed_content is None:
+                with open(output_paths['processed_content'], 'r', encoding='utf-8') as f:
+                    processed_content = f.read()
             generate_html(processed_content, output_paths['processed_html'])
             logger.info("Created HTML file")
         else:
@@ -695,10 +1428,11 @@ def process_youtube_audio(url: str, output_base_dir: str = DEFAULT_OUTPUT_DIR) -
         sys.exit(1)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python app.py \"<youtube_url>\"")
+    args = [arg for arg in sys.argv[1:] if arg != "--legacy-split"]
+    if len(args) != 1:
+        print("Usage: python main.py \"<youtube_url>\" [--legacy-split]")
         print("Note: Make sure to wrap the URL in quotes!")
         sys.exit(1)
     
-    youtube_url = sys.argv[1]
-    process_youtube_audio(youtube_url) 
\ No newline at end of file
+    youtube_url = args[0]
+    process_youtube_audio(youtube_url, legacy_split="--legacy-split" in sys.argv[1:] or LEGACY_SPLIT) 
\ No newline at end of file
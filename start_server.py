@@ -4,126 +4,228 @@ Startup script for the YouTube to HTML Summary FastAPI server.
 This script checks dependencies and starts the server with proper error handling.
 """
 
+import os
 import sys
-import subprocess
-import importlib.util
+import time
+import shutil
+import socket
+import tempfile
+import functools
+import importlib.machinery
+import concurrent.futures
 
-def check_dependency(module_name, package_name=None):
-    """Check if a Python module is available."""
-    if package_name is None:
-        package_name = module_name
+# The auto-reloader runs the app in a second process that watches the source
+# tree, so it is only enabled for development
+DEV_RELOAD = os.getenv("DEV_RELOAD", "0") == "1"
+# Each worker process loads its own Whisper model, so more than one needs
+# the memory (or VRAM) for several
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+
+OLLAMA_HOST = "127.0.0.1"
+OLLAMA_PORT = 11434
+
+# A successful Ollama probe is remembered for a minute, so restarting the
+# server repeatedly during development doesn't probe it every time
+OLLAMA_CHECK_CACHE = os.path.join(tempfile.gettempdir(), ".yt2html_ollama_ok")
+OLLAMA_CHECK_TTL = 60  # seconds
+
+# (module, package) pairs, lightest packages first so they are reported first
+REQUIRED_MODULES = (
+    ('fastapi', 'FastAPI'),
+    ('uvicorn', 'Uvicorn'),
+    ('tqdm', 'tqdm'),
+    ('numpy', 'NumPy'),
+    ('yt_dlp', 'yt-dlp'),
+    ('openai', 'OpenAI'),
+    ('faster_whisper', 'faster-whisper'),
+    ('torch', 'PyTorch')
+)
+
+# Where package managers install ffmpeg; checked before searching all of PATH
+FFMPEG_KNOWN_PATHS = ("/usr/local/bin/ffmpeg", "/opt/homebrew/bin/ffmpeg", "/usr/bin/ffmpeg")
+
+# Static output, joined once so each block is printed with a single write
+BANNER = "\n".join([
+    "🚀 YouTube to HTML Summary API v2.0",
+    "=" * 50,
+    "✨ Enhanced Features:",
+    "   • SQLite database storage",
+    "   • Real-time task filtering",
+    "   • Statistics dashboard",
+    "   • Iframe preview for completed tasks",
+    "   • Advanced task management",
+    "   • Background processing",
+    "=" * 50,
+    "\n📦 Checking Python and system dependencies..."
+])
+
+SERVER_INFO = "\n".join([
+    "\n✅ All dependencies are satisfied!",
+    "\n🌐 Starting FastAPI server...",
+    "📱 Open your browser and navigate to: http://localhost:8000",
+    "📚 API documentation available at: http://localhost:8000/docs",
+    "📊 Database will be automatically created: youtube_summary.db",
+    "\n🎯 New Features:",
+    "   • Click 'Stats' button to view statistics dashboard",
+    "   • Use filter buttons to view tasks by status",
+    "   • Search tasks by video ID or title",
+    "   • Click 'Preview Result' to view HTML in iframe",
+    "   • Use 'Cleanup Old' to remove old tasks",
+    "\nPress Ctrl+C to stop the server.",
+    "=" * 50
+])
+
+@functools.lru_cache(maxsize=None)
+def is_module_available(module_name):
+    """Check whether a module can be imported, without importing anything.
     
-    spec = importlib.util.find_spec(module_name)
-    if spec is None:
-        print(f"❌ {package_name} is not installed.")
-        return False
-    else:
-        print(f"✅ {package_name} is available.")
+    Modules that are already loaded need no lookup at all. Other
+    top-level names are looked up on sys.path directly. Dotted names, and
+    modules only reachable through an import hook (such as editable
+    installs), fall back to importlib's find_spec, which imports the parent
+    packages of a dotted name. Results are cached for the life of the process.
+    """
+    if module_name in sys.modules:
         return True
+    if '.' not in module_name:
+        if module_name in sys.builtin_module_names:
+            return True
+        if importlib.machinery.PathFinder.find_spec(module_name) is not None:
+            return True
+    from importlib.util import find_spec
+    try:
+        return find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
 
 def check_ollama():
-    """Check if Ollama is running."""
+    """Check if Ollama is running. Returns (running, result line).
+    
+    A successful check from the last OLLAMA_CHECK_TTL seconds is trusted.
+    """
     try:
-        import requests
-        response = requests.get("http://127.0.0.1:11434/api/tags", timeout=5)
-        if response.status_code == 200:
-            print("✅ Ollama is running.")
-            return True
+        if time.time() - os.path.getmtime(OLLAMA_CHECK_CACHE) < OLLAMA_CHECK_TTL:
+            return True, "✅ Ollama is running."
+    except OSError:
+        pass
+    
+    # A plain TCP connect fails fast when nothing is listening
+    try:
+        socket.create_connection((OLLAMA_HOST, OLLAMA_PORT), timeout=1).close()
+    except OSError as e:
+        return False, f"❌ Ollama is not running or not accessible: {e}"
+    
+    try:
+        from http.client import HTTPConnection
+        connection = HTTPConnection(OLLAMA_HOST, OLLAMA_PORT, timeout=5)
+        try:
+            connection.request("GET", "/api/tags")
+            status = connection.getresponse().status
+        finally:
+            connection.close()
+        if status == 200:
+            try:
+                with open(OLLAMA_CHECK_CACHE, 'w'):
+                    pass
+            except OSError:
+                pass  # Only means the next start probes again
+            return True, "✅ Ollama is running."
         else:
-            print("❌ Ollama is not responding properly.")
-            return False
+            return False, "❌ Ollama is not responding properly."
     except Exception as e:
-        print(f"❌ Ollama is not running or not accessible: {e}")
-        return False
+        return False, f"❌ Ollama is not running or not accessible: {e}"
 
-def check_ffmpeg():
-    """Check if FFmpeg is installed."""
-    try:
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            print("✅ FFmpeg is available.")
-            return True
-        else:
-            print("❌ FFmpeg is not working properly.")
-            return False
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        print("❌ FFmpeg is not installed or not in PATH.")
-        return False
+def find_ffmpeg():
+    """Return the path of an ffmpeg executable, or None if there is none."""
+    for ffmpeg_path in FFMPEG_KNOWN_PATHS:
+        if os.access(ffmpeg_path, os.X_OK):
+            return ffmpeg_path
+    return shutil.which('ffmpeg')
+
+def check_ffmpeg(deep=False):
+    """Check if FFmpeg is installed. Returns (available, result line).
+    
+    Only looks the executable up, in the usual install locations and then
+    on PATH; with deep=True it is also run, to make sure it actually works.
+    """
+    ffmpeg_path = find_ffmpeg()
+    if ffmpeg_path is None:
+        return False, "❌ FFmpeg is not installed or not in PATH."
+    
+    if deep:
+        import subprocess
+        try:
+            # Only the return code matters; discard the version banner
+            result = subprocess.run([ffmpeg_path, '-version'], 
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        except (subprocess.TimeoutExpired, OSError):
+            result = None
+        if result is None or result.returncode != 0:
+            return False, "❌ FFmpeg is not working properly."
+    
+    return True, "✅ FFmpeg is available."
 
 def main():
     """Main function to check dependencies and start the server."""
-    print("🚀 YouTube to HTML Summary API v2.0")
-    print("=" * 50)
-    print("✨ Enhanced Features:")
-    print("   • SQLite database storage")
-    print("   • Real-time task filtering")
-    print("   • Statistics dashboard")
-    print("   • Iframe preview for completed tasks")
-    print("   • Advanced task management")
-    print("   • Background processing")
-    print("=" * 50)
+    # The Ollama probe can wait up to its timeout and the FFmpeg check may
+    # run a subprocess, so they run in the background, the Ollama probe
+    # starting even before the banner. Module lookups are only a few stats
+    # each and run inline meanwhile.
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    ollama_future = pool.submit(check_ollama)
+    
+    print(BANNER)
     
-    # Check Python dependencies
-    print("\n📦 Checking Python dependencies...")
-    required_modules = [
-        ('fastapi', 'FastAPI'),
-        ('uvicorn', 'Uvicorn'),
-        ('whisper', 'OpenAI Whisper'),
-        ('pydub', 'Pydub'),
-        ('yt_dlp', 'yt-dlp'),
-        ('openai', 'OpenAI'),
-        ('torch', 'PyTorch'),
-        ('numpy', 'NumPy'),
-        ('tqdm', 'tqdm'),
-        ('requests', 'Requests')
-    ]
+    ffmpeg_future = pool.submit(check_ffmpeg, "--deep-check" in sys.argv[1:])
+    missing_deps = [package for module, package in REQUIRED_MODULES if not is_module_available(module)]
+    pool.shutdown(wait=True)
     
-    missing_deps = []
-    for module, package in required_modules:
-        if not check_dependency(module, package):
-            missing_deps.append(package)
+    # The checks only return their result lines; print them all in one write
+    ffmpeg_ok, ffmpeg_line = ffmpeg_future.result()
+    ollama_ok, ollama_line = ollama_future.result()
+    print("\n".join(
+        [f"❌ {package} is not installed." if package in missing_deps else f"✅ {package} is available."
+         for _, package in REQUIRED_MODULES]
+        + [ffmpeg_line, ollama_line]
+    ))
     
     if missing_deps:
         print(f"\n❌ Missing dependencies: {', '.join(missing_deps)}")
         print("Please install them using:")
-        print("uv pip install fastapi uvicorn openai-whisper pydub yt-dlp openai torch numpy tqdm requests")
+        print("uv pip install fastapi uvicorn tqdm numpy yt-dlp openai faster-whisper torch")
         sys.exit(1)
     
-    # Check system dependencies
-    print("\n🔧 Checking system dependencies...")
-    if not check_ffmpeg():
+    if not ffmpeg_ok:
         print("\nPlease install FFmpeg:")
         print("- macOS: brew install ffmpeg")
         print("- Ubuntu/Debian: sudo apt-get install ffmpeg")
         print("- Windows: Download from https://ffmpeg.org/download.html")
         sys.exit(1)
     
-    if not check_ollama():
+    if not ollama_ok:
         print("\nPlease start Ollama:")
         print("1. Install Ollama from https://ollama.ai/")
         print("2. Pull the required model: ollama pull deepseek-r1:32b")
         print("3. Start Ollama: ollama serve")
         sys.exit(1)
     
-    print("\n✅ All dependencies are satisfied!")
-    print("\n🌐 Starting FastAPI server...")
-    print("📱 Open your browser and navigate to: http://localhost:8000")
-    print("📚 API documentation available at: http://localhost:8000/docs")
-    print("📊 Database will be automatically created: youtube_summary.db")
-    print("\n🎯 New Features:")
-    print("   • Click 'Stats' button to view statistics dashboard")
-    print("   • Use filter buttons to view tasks by status")
-    print("   • Search tasks by video ID or title")
-    print("   • Click 'Preview Result' to view HTML in iframe")
-    print("   • Use 'Cleanup Old' to remove old tasks")
-    print("\nPress Ctrl+C to stop the server.")
-    print("=" * 50)
+    print(SERVER_INFO)
     
     # Start the server
     try:
         import uvicorn
-        uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
+        # libuv event loop and C HTTP parser when installed (uvloop has no Windows build)
+        loop = "uvloop" if is_module_available("uvloop") else "asyncio"
+        http = "httptools" if is_module_available("httptools") else "h11"
+        print(f"⚙️  Event loop: {loop}, HTTP parser: {http}")
+        workers = 1 if DEV_RELOAD else SERVER_WORKERS
+        if DEV_RELOAD or workers > 1:
+            # Reloader and worker processes import the app themselves
+            app = "api:app"
+        else:
+            # Serve from this process, importing the app only once
+            from api import app
+        uvicorn.run(app, host="0.0.0.0", port=8000, reload=DEV_RELOAD, workers=workers, loop=loop, http=http)
     except KeyboardInterrupt:
         print("\n👋 Server stopped by user.")
     except Exception as e:
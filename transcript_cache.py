@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for Whisper transcriptions.
+
+Entries are keyed by the SHA-256 of the audio bytes together with the model
+name and the transcription parameters, so the same audio is never
+transcribed twice with the same settings, whatever video or file name it
+comes from. Set YT2HTML_NO_CACHE=1 to bypass the cache.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, Optional
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "yt2html", "transcripts")
+CACHE_DISABLED = os.getenv("YT2HTML_NO_CACHE", "0") == "1"
+HASH_CHUNK_SIZE = 1024 * 1024  # Audio is hashed in 1 MB reads
+
+logger = logging.getLogger(__name__)
+
+def transcript_key(audio_path: str, model_name: str, params: Dict[str, Any]) -> Optional[str]:
+    """Return the cache key for transcribing audio_path, or None when caching is disabled."""
+    if CACHE_DISABLED:
+        return None
+
+    digest = hashlib.sha256()
+    with open(audio_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(block)
+    digest.update(b'\0' + model_name.encode('utf-8'))
+    digest.update(b'\0' + json.dumps(params, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def load_transcript(key: Optional[str]) -> Optional[Any]:
+    """Return the cached transcription result for key, or None on a miss."""
+    if key is None:
+        return None
+
+    try:
+        with open(_cache_path(key), 'r', encoding='utf-8') as f:
+            return json.load(f)["result"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable transcript cache entry {key}: {e}")
+        return None
+
+def store_transcript(key: Optional[str], model_name: str, params: Dict[str, Any], result: Any) -> None:
+    """Cache a transcription result under key.
+
+    The entry is written to a temporary file and renamed into place, so
+    readers never see a partial entry. Failures are logged, not raised:
+    the cache is only an optimization.
+    """
+    if key is None:
+        return
+
+    envelope = {"model": model_name, "params": params, "result": result}
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(envelope, f, ensure_ascii=False)
+            os.replace(tmp_path, _cache_path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"Could not write transcript cache entry {key}: {e}")